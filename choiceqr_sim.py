@@ -0,0 +1,156 @@
+import argparse
+import io
+import random
+import secrets
+import threading
+import time
+
+import pandas as pd
+from flask import Flask, Response, jsonify, request
+
+# Local stand-in for the ChoiceQR admin API used by main.py: POST
+# /api/auth/local and GET /api/export/xlsx, optionally prefixed with a venue
+# key (/<venue_key>/api/...). Menus are generated per venue from --seed, and
+# latency, failures, token expiry and slow bodies can be injected.
+#
+#   python choiceqr_sim.py --port 8081 --dishes 40 --latency-ms 200 --fail-rate 0.1
+#   CHOICEQR_BASE_URL=http://127.0.0.1:8081 IDENTIFIER=x PASSWORD=y python main.py
+
+app = Flask(__name__)
+
+SETTINGS = {}
+TOKENS = {}
+EXPORT_CACHE = {}
+tokens_lock = threading.Lock()
+
+SECTION_NAMES = ["Кухня", "Сети", "Роли", "Коктейльна карта", "Гарячі напої", "Безалкогольний бар", "Винна карта", "Пиво"]
+WORDS = ["соус", "сир", "томати", "базилік", "лосось", "рис", "огірок", "перець", "часник", "лайм", "мʼята", "карамель"]
+
+
+def generate_export(venue_key):
+    rng = random.Random(f"{SETTINGS['seed']}:{venue_key}")
+    rows = []
+
+    for section_index in range(SETTINGS["sections"]):
+        section = SECTION_NAMES[section_index % len(SECTION_NAMES)]
+        if section_index >= len(SECTION_NAMES):
+            section = f"{section} {section_index // len(SECTION_NAMES) + 1}"
+
+        for category_index in range(SETTINGS["categories"]):
+            category = f"Категорія {section_index + 1}.{category_index + 1}"
+            for dish_index in range(SETTINGS["dishes"]):
+                rows.append({
+                    "Section": section,
+                    "Category": category,
+                    "Dish name": f"Страва {section_index + 1}.{category_index + 1}.{dish_index + 1}",
+                    "Description": ", ".join(rng.sample(WORDS, rng.randint(0, 5))),
+                    "Price": rng.choice([0, 95, 120, 185, 240, 320, 450]),
+                    "Weight, g": rng.choice(["", 150, 250, 300, "200/50"]),
+                })
+
+    buffer = io.BytesIO()
+    pd.DataFrame(rows).to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def inject_faults(kind):
+    latency = SETTINGS["latency_ms"] + random.uniform(0, SETTINGS["jitter_ms"])
+    if latency:
+        time.sleep(latency / 1000)
+
+    if random.random() < SETTINGS[f"{kind}_fail_rate"]:
+        return jsonify({"message": f"Injected {kind} failure"}), 500
+    return None
+
+
+@app.route("/api/auth/local", methods=["POST"])
+@app.route("/<venue_key>/api/auth/local", methods=["POST"])
+def login(venue_key="default"):
+    fault = inject_faults("login")
+    if fault:
+        return fault
+
+    payload = request.get_json(silent=True) or {}
+    if not payload.get("identifier") or not payload.get("password"):
+        return jsonify({"message": "identifier and password are required"}), 400
+    if SETTINGS["password"] and payload["password"] != SETTINGS["password"]:
+        return jsonify({"message": "Invalid credentials"}), 401
+
+    token = secrets.token_hex(16)
+    with tokens_lock:
+        TOKENS[token] = time.monotonic() + SETTINGS["token_ttl"] if SETTINGS["token_ttl"] else None
+
+    return jsonify({"token": token}), 201
+
+
+@app.route("/api/export/xlsx")
+@app.route("/<venue_key>/api/export/xlsx")
+def export_xlsx(venue_key="default"):
+    fault = inject_faults("export")
+    if fault:
+        return fault
+
+    token = request.headers.get("authorization") or request.cookies.get("token")
+    with tokens_lock:
+        if token not in TOKENS:
+            return jsonify({"message": "Unauthorized"}), 401
+        expires_at = TOKENS[token]
+        if expires_at is not None and time.monotonic() > expires_at:
+            del TOKENS[token]
+            return jsonify({"message": "Token expired"}), 401
+
+    body = EXPORT_CACHE.get(venue_key)
+    if body is None:
+        body = EXPORT_CACHE[venue_key] = generate_export(venue_key)
+
+    slow_body_kbps = SETTINGS["slow_body_kbps"]
+    if not slow_body_kbps:
+        return Response(body, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    def trickle():
+        chunk_size = 4096
+        for offset in range(0, len(body), chunk_size):
+            yield body[offset:offset + chunk_size]
+            time.sleep(chunk_size / (slow_body_kbps * 1024))
+
+    return Response(trickle(), mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local ChoiceQR API simulator.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--seed", default="menu", help="seed for generated menus and injected faults")
+    parser.add_argument("--sections", type=int, default=6)
+    parser.add_argument("--categories", type=int, default=5, help="categories per section")
+    parser.add_argument("--dishes", type=int, default=12, help="dishes per category")
+    parser.add_argument("--password", help="only accept this password (default: any)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra latency up to this value")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--login-fail-rate", type=float, help="override --fail-rate for logins")
+    parser.add_argument("--export-fail-rate", type=float, help="override --fail-rate for exports")
+    parser.add_argument("--token-ttl", type=float, default=0.0, help="seconds before tokens expire (0 = never)")
+    parser.add_argument("--slow-body-kbps", type=float, default=0.0, help="throttle export bodies to this rate")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    SETTINGS.update({
+        "seed": args.seed,
+        "sections": args.sections,
+        "categories": args.categories,
+        "dishes": args.dishes,
+        "password": args.password,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "login_fail_rate": args.fail_rate if args.login_fail_rate is None else args.login_fail_rate,
+        "export_fail_rate": args.fail_rate if args.export_fail_rate is None else args.export_fail_rate,
+        "token_ttl": args.token_ttl,
+        "slow_body_kbps": args.slow_body_kbps,
+    })
+
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
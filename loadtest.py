@@ -0,0 +1,198 @@
+import argparse
+import json
+import logging
+import os
+import random
+import shlex
+import tempfile
+import threading
+import time
+
+import requests
+
+# Load generator for the Flask routes. By default it prepares fake venue
+# artifacts, serves main.app in-process and drives /, /status and
+# /download/<venue_key>. Point --url at any other server (gunicorn, waitress,
+# ...) started on a --prepare-only directory to compare WSGI setups.
+#
+#   python loadtest.py --venues 200 --concurrency 32 --duration 20
+#   python loadtest.py --prepare-only /tmp/lt --venues 200
+#   python loadtest.py --url http://127.0.0.1:8000 --venues 200 --mix status=10,download=1
+
+DEFAULT_MIX = "index=1,status=8,download=1"
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        route, _, weight = part.partition("=")
+        route = route.strip()
+        if route not in ("index", "status", "download"):
+            raise SystemExit(f"Unknown route in --mix: {route}")
+        weights[route] = float(weight or 1)
+    return weights
+
+
+def venue_keys(count):
+    return [f"venue-{i:03d}" for i in range(count)]
+
+
+def prepare_artifacts(root, venue_count, pdf_kb):
+    save_path = os.path.join(root, "exports")
+    venues = {}
+    pdf_body = b"%PDF-1.4\n" + os.urandom(pdf_kb * 1024) + b"\n%%EOF\n"
+
+    for venue_key in venue_keys(venue_count):
+        venues[venue_key] = {
+            "name": venue_key,
+            "subbrand": f"Load test venue {venue_key}",
+            "host": "127.0.0.1",
+            "identifier_env": "LOADTEST_IDENTIFIER",
+            "password_env": "LOADTEST_PASSWORD",
+        }
+        venue_dir = os.path.join(save_path, venue_key)
+        os.makedirs(venue_dir, exist_ok=True)
+        with open(os.path.join(venue_dir, "menu.pdf"), "wb") as f:
+            f.write(pdf_body)
+
+    venues_config = os.path.join(root, "venues.json")
+    with open(venues_config, "w", encoding="utf-8") as f:
+        json.dump(venues, f, indent=4)
+
+    return {
+        "SAVE_PATH": save_path,
+        "VENUES_CONFIG": venues_config,
+        "LEASE_DB": "",
+        "ON_DEMAND_RENDER": "0",
+    }
+
+
+def start_local_server(env):
+    # main reads its configuration at import time.
+    os.environ.update(env)
+
+    from werkzeug.serving import make_server
+    import main
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_load(base_url, venues, weights, concurrency, duration, total_requests):
+    routes = list(weights)
+    route_weights = [weights[route] for route in routes]
+    results = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    results_lock = threading.Lock()
+    issued = [0]
+    deadline = time.monotonic() + duration
+
+    def next_request():
+        with results_lock:
+            if total_requests and issued[0] >= total_requests:
+                return None
+            issued[0] += 1
+        if not total_requests and time.monotonic() >= deadline:
+            return None
+        return random.choices(routes, route_weights)[0]
+
+    def worker():
+        session = requests.Session()
+        while True:
+            route = next_request()
+            if route is None:
+                return
+
+            if route == "index":
+                path = "/"
+            elif route == "status":
+                path = "/status"
+            else:
+                path = f"/download/{random.choice(venues)}"
+
+            started = time.perf_counter()
+            try:
+                response = session.get(base_url + path, timeout=30)
+                response.content
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with results_lock:
+                results[route].append(elapsed_ms)
+                if not ok:
+                    errors[route] += 1
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return results, errors, time.monotonic() - started
+
+
+def print_report(results, errors, elapsed, concurrency):
+    total = sum(len(latencies) for latencies in results.values())
+    print(f"\n{total} requests in {elapsed:.2f}s at concurrency {concurrency}: {total / elapsed:.1f} req/s\n")
+    print(f"{'route':<10}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+    for route, latencies in results.items():
+        latencies = sorted(latencies)
+        print(
+            f"{route:<10}{len(latencies):>8}{errors[route]:>8}{len(latencies) / elapsed:>10.1f}"
+            f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}"
+            f"{percentile(latencies, 99):>10.1f}{(latencies[-1] if latencies else 0):>10.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the menu server routes.")
+    parser.add_argument("--url", help="target an already running server instead of an in-process one")
+    parser.add_argument("--venues", type=int, default=20, help="number of fake venues (default 20)")
+    parser.add_argument("--pdf-kb", type=int, default=300, help="size of each fake PDF in KiB (default 300)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (default 10)")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests instead")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--prepare-only", metavar="DIR", help="write fake artifacts to DIR and print the env to serve them")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    venues = venue_keys(args.venues)
+
+    if args.prepare_only:
+        env = prepare_artifacts(args.prepare_only, args.venues, args.pdf_kb)
+        print(" ".join(f"{key}={shlex.quote(value)}" for key, value in env.items()))
+        return
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        env = prepare_artifacts(tempfile.mkdtemp(prefix="menu-loadtest-"), args.venues, args.pdf_kb)
+        server, base_url = start_local_server(env)
+
+    try:
+        results, errors, elapsed = run_load(
+            base_url.rstrip("/"), venues, weights, args.concurrency, args.duration, args.requests
+        )
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print_report(results, errors, elapsed, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
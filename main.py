@@ -1,11 +1,32 @@
-from flask import Flask, send_file, render_template_string, jsonify
+from flask import Flask, Response, request, send_file, jsonify, render_template
 import requests
 import time
 import threading
 import os
+import gzip
+import hashlib
+import hmac
 import html
+import io
+import argparse
+import json
+import shutil
+import socket
+import sqlite3
+import atexit
+import signal
+import fcntl
+import subprocess
+import sys
+import zipfile
+from collections import deque
+from contextlib import contextmanager
+from types import MappingProxyType
 import pandas as pd
 from weasyprint import HTML
+from pdf_optimize import optimize_pdf
+from pdf_preview import preview_name, render_previews
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 import logging
@@ -14,93 +35,63 @@ import logging
 # CONFIG
 # ======================
 
-app = Flask(__name__)
-
-SAVE_PATH = "./exports"
-
-VENUES = {
-    "sunrise": {
-        "name": "Sunrise",
-        "subbrand": "Офіційне меню ресторану Sunrise",
-        "identifier_env": "SUNRISE_IDENTIFIER",
-        "password_env": "SUNRISE_PASSWORD",
-        "identifier": os.getenv("SUNRISE_IDENTIFIER") or os.getenv("IDENTIFIER"),
-        "password": os.getenv("SUNRISE_PASSWORD") or os.getenv("PASSWORD"),
-        "login_url": "https://sunrise.choiceqr.com/api/auth/local",
-        "export_url": "https://sunrise.choiceqr.com/api/export/xlsx",
-        "referer": "https://sunrise.choiceqr.com/admin/",
-        "section_order": [
-            "Сети", "Роли", "Кухня", "Ланчі 11:00-17:00",
-            "Коктейльна карта", "Гарячі напої",
-            "Безалкогольний бар", "Алкогольний бар", "Винна карта",
-        ],
-        "excluded_sections": [],
-    },
-    "babuin": {
-        "name": "BABUIN",
-        "subbrand": "Офіційне меню ресторану BABUIN",
-        "identifier_env": "BABUIN_IDENTIFIER",
-        "password_env": "BABUIN_PASSWORD",
-        "identifier": os.getenv("BABUIN_IDENTIFIER"),
-        "password": os.getenv("BABUIN_PASSWORD"),
-        "login_url": "https://babuin.choiceqr.com/api/auth/local",
-        "export_url": "https://babuin.choiceqr.com/api/export/xlsx",
-        "referer": "https://babuin.choiceqr.com/admin/",
-        "section_order": [
-            "BBQ Меню",
-            "Основне Меню",
-            "Ланчі та бранчі з 12:00 до 17:00",
-            "Коктейльна карта",
-            "Гарячі напої",
-            "Безалкогольний бар",
-            "Пиво",
-            "Винна карта",
-            "Алкогольний бар",
-        ],
-        "excluded_sections": ["Банкетне меню", "Кейтеринг", "Кайтеринг", "Кейтеринг BABUIN"],
-    },
-    "hochu-z-yisti": {
-        "name": "hochu-z-yisti",
-        "subbrand": "Офіційне меню закладу hochu-z-yisti",
-        "identifier_env": "HOCHU_Z_YISTI_IDENTIFIER",
-        "password_env": "HOCHU_Z_YISTI_PASSWORD",
-        "identifier": os.getenv("HOCHU_Z_YISTI_IDENTIFIER") or os.getenv("IDENTIFIER"),
-        "password": os.getenv("HOCHU_Z_YISTI_PASSWORD") or os.getenv("PASSWORD"),
-        "login_url": "https://hochu-z-yisti.choiceqr.com/api/auth/local",
-        "export_url": "https://hochu-z-yisti.choiceqr.com/api/export/xlsx",
-        "referer": "https://hochu-z-yisti.choiceqr.com/admin/",
-        "section_order": [],
-        "excluded_sections": [],
-    },
-    "hochu-rebra": {
-        "name": "hochu-rebra",
-        "subbrand": "Офіційне меню закладу hochu-rebra",
-        "identifier_env": "HOCHU_REBRA_IDENTIFIER",
-        "password_env": "HOCHU_REBRA_PASSWORD",
-        "identifier": os.getenv("HOCHU_REBRA_IDENTIFIER") or os.getenv("IDENTIFIER"),
-        "password": os.getenv("HOCHU_REBRA_PASSWORD") or os.getenv("PASSWORD"),
-        "login_url": "https://hochu-rebra.choiceqr.com/api/auth/local",
-        "export_url": "https://hochu-rebra.choiceqr.com/api/export/xlsx",
-        "referer": "https://hochu-rebra.choiceqr.com/admin/",
-        "section_order": [],
-        "excluded_sections": [],
-    },
-    "yo-yo": {
-        "name": "yo-yo",
-        "subbrand": "Офіційне меню закладу yo-yo",
-        "identifier_env": "YO_YO_IDENTIFIER",
-        "password_env": "YO_YO_PASSWORD",
-        "identifier": os.getenv("YO_YO_IDENTIFIER") or os.getenv("IDENTIFIER"),
-        "password": os.getenv("YO_YO_PASSWORD") or os.getenv("PASSWORD"),
-        "login_url": "https://yo-yo.choiceqr.com/api/auth/local",
-        "export_url": "https://yo-yo.choiceqr.com/api/export/xlsx",
-        "referer": "https://yo-yo.choiceqr.com/admin/",
-        "section_order": [],
-        "excluded_sections": [],
-    },
-}
-
-UPDATE_INTERVAL = 7200  # 2 hours
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+app = Flask(__name__, static_folder=None)
+
+SAVE_PATH = os.getenv("SAVE_PATH", "./exports")
+VENUES_CONFIG = os.getenv("VENUES_CONFIG", "./venues.json")
+VENUES_RELOAD_INTERVAL = 30  # seconds between config mtime checks
+
+# Points every venue at one ChoiceQR-compatible server (e.g. choiceqr_sim.py)
+# as <base>/<venue_key>/api/..., overriding the hosts in venues.json.
+CHOICEQR_BASE_URL = os.getenv("CHOICEQR_BASE_URL", "").rstrip("/")
+
+# ChoiceQR (or our own tooling) POSTs /webhook/<venue_key> when a menu
+# changes; signals are debounced into one refresh of that venue. With
+# webhooks enabled the full polling cycle is only a safety net.
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_DEBOUNCE = int(os.getenv("WEBHOOK_DEBOUNCE", 60))  # quiet period before refreshing
+WEBHOOK_MAX_DELAY = int(os.getenv("WEBHOOK_MAX_DELAY", 300))  # cap for a stream of edits
+
+UPDATE_INTERVAL = int(os.getenv("UPDATE_INTERVAL", 6 * 3600 if WEBHOOK_SECRET else 7200))
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", 4))
+
+# WeasyPrint runs in a short-lived child (render_sandbox.py) so its peak memory
+# is returned to the OS after every render. Both limits can be overridden per
+# venue with render_memory_limit_mb / render_timeout in venues.json.
+RENDER_SANDBOX = os.getenv("RENDER_SANDBOX", "1") != "0"
+RENDER_SANDBOX_SCRIPT = os.path.join(BASE_DIR, "render_sandbox.py")
+RENDER_MEMORY_LIMIT_MB = int(os.getenv("RENDER_MEMORY_LIMIT_MB", 1536))
+RENDER_TIMEOUT = int(os.getenv("RENDER_TIMEOUT", 300))
+RENDER_VARIANT_WORKERS = int(os.getenv("RENDER_VARIANT_WORKERS", 2))
+# Venues x variants can start many renders at once; together they may only
+# reserve this much of their memory limits, the rest wait for a slot.
+RENDER_MEMORY_BUDGET_MB = int(os.getenv("RENDER_MEMORY_BUDGET_MB", 3072))
+
+# Recompress/dedupe pass over every rendered PDF (pdf_optimize.py); venues can
+# opt out with "pdf_optimize": false.
+PDF_OPTIMIZE = os.getenv("PDF_OPTIMIZE", "1") != "0"
+
+# The first pages of each venue's primary PDF are rasterized into small WebP
+# previews (pdf_preview.py) for the venue cards; 0 turns them off.
+PREVIEW_PAGES = int(os.getenv("PREVIEW_PAGES", 4))
+PREVIEW_KEEP = 2  # preview sets kept per venue, so open pages can still load the last one
+
+# Downloads of a missing or stale venue trigger a refresh of just that venue.
+# Concurrent requests share the in-flight job; a missing PDF is waited for up
+# to ON_DEMAND_TIMEOUT seconds, a stale one is served while it refreshes.
+ON_DEMAND_RENDER = os.getenv("ON_DEMAND_RENDER", "1") != "0"
+ON_DEMAND_WORKERS = int(os.getenv("ON_DEMAND_WORKERS", 4))
+ON_DEMAND_TIMEOUT = int(os.getenv("ON_DEMAND_TIMEOUT", 60))
+ON_DEMAND_MAX_AGE = int(os.getenv("ON_DEMAND_MAX_AGE", UPDATE_INTERVAL + 600))
+ON_DEMAND_RETRY_AFTER = int(os.getenv("ON_DEMAND_RETRY_AFTER", 60))
+
+# Replicas sharing SAVE_PATH elect a single updater through a TTL lease row.
+# Set LEASE_DB to an empty string to disable coordination (single node).
+LEASE_DB = os.getenv("LEASE_DB", os.path.join(SAVE_PATH, "lease.sqlite3"))
+LEASE_TTL = int(os.getenv("LEASE_TTL", 300))
+NODE_ID = os.getenv("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
 KYIV_TIMEZONE = ZoneInfo("Europe/Kyiv")
 
 
@@ -108,23 +99,116 @@ def now_kyiv():
     return datetime.now(KYIV_TIMEZONE)
 
 update_lock = threading.Lock()
+venues_lock = threading.Lock()
+
+VENUES = {}
+VENUES_MTIME = None
+
+def new_venue_status():
+    return {
+        "excel_downloaded": False,
+        "pdf_generated": False,
+        "pdf_ready": False,
+        "variants_ready": (),
+        "last_success": None,
+        "last_primary_success": None,
+        "last_attempt": None,
+        "error": None,
+        "failed_attempts": 0,
+        "render_seconds": None,
+        "render_peak_rss_mb": None,
+        "pdf_bytes": {},
+        "previews": None,
+    }
+
+
+# ======================
+# STATUS
+# ======================
+
+# STATUS is an immutable snapshot that writers replace as a whole under
+# status_lock; readers just grab the current reference and never see a
+# half-updated venue. The /status body is serialized at publish time from
+# per-venue JSON fragments, so only changed venues are re-encoded.
 
-STATUS = {
+status_lock = threading.Lock()
+STATUS = MappingProxyType({
     "last_update": None,
     "next_update": None,
     "countdown": 0,
-    "venues": {
-        key: {
-            "excel_downloaded": False,
-            "pdf_generated": False,
-            "pdf_ready": False,
-            "last_success": None,
-            "last_attempt": None,
-            "error": None,
+    "update_owner": None,
+    "venues": MappingProxyType({}),
+})
+STATUS_BODY = b"{}"
+VENUE_STATUS_JSON = {}
+
+
+def isoformat_or_none(value):
+    return value.isoformat() if value else None
+
+
+def venue_status_json(venue_status):
+    return json.dumps({
+        **venue_status,
+        "last_success": isoformat_or_none(venue_status["last_success"]),
+        "last_primary_success": isoformat_or_none(venue_status["last_primary_success"]),
+        "last_attempt": isoformat_or_none(venue_status["last_attempt"]),
+    }, ensure_ascii=False)
+
+
+def publish_status(state, venues, changed_venues):
+    global STATUS, STATUS_BODY
+
+    for venue_key in changed_venues:
+        VENUE_STATUS_JSON[venue_key] = venue_status_json(venues[venue_key])
+    for venue_key in list(VENUE_STATUS_JSON):
+        if venue_key not in venues:
+            del VENUE_STATUS_JSON[venue_key]
+
+    head = json.dumps({
+        "timezone": "Europe/Kyiv",
+        "last_update": isoformat_or_none(state["last_update"]),
+        "next_update": isoformat_or_none(state["next_update"]),
+        "countdown_seconds": state["countdown"],
+        "node": NODE_ID,
+        "update_owner": state["update_owner"],
+    }, ensure_ascii=False)
+    venues_json = ", ".join(
+        f"{json.dumps(venue_key, ensure_ascii=False)}: {VENUE_STATUS_JSON[venue_key]}"
+        for venue_key in venues
+    )
+    body = f'{head[:-1]}, "venues": {{{venues_json}}}}}'.encode("utf-8")
+
+    STATUS = MappingProxyType({**state, "venues": MappingProxyType(venues)})
+    STATUS_BODY = body
+
+
+def update_status(**fields):
+    with status_lock:
+        if all(STATUS[field] == value for field, value in fields.items()):
+            return
+        publish_status({**STATUS, **fields}, dict(STATUS["venues"]), ())
+
+
+def update_venue_status(venue_key, **fields):
+    with status_lock:
+        current = STATUS["venues"].get(venue_key)
+        if current is None:
+            return  # dropped by a config reload
+        venues = dict(STATUS["venues"])
+        venues[venue_key] = MappingProxyType({**current, **fields})
+        publish_status(dict(STATUS), venues, (venue_key,))
+
+
+def replace_venue_statuses(venue_keys):
+    # Keeps the status of venues that survive a reload, adds fresh ones.
+    with status_lock:
+        previous = STATUS["venues"]
+        venues = {
+            venue_key: previous.get(venue_key) or MappingProxyType(new_venue_status())
+            for venue_key in venue_keys
         }
-        for key in VENUES
-    }
-}
+        publish_status(dict(STATUS), venues, [venue_key for venue_key in venues if venue_key not in previous])
 
 
 # ======================
@@ -137,19 +221,225 @@ logging.basicConfig(
 )
 
 
+# ======================
+# TRACING
+# ======================
+
+TRACE_HISTORY = int(os.getenv("TRACE_HISTORY", 20))
+TRACES = deque(maxlen=TRACE_HISTORY)
+trace_local = threading.local()
+
+
+class Span:
+    __slots__ = ("name", "started", "ended", "attrs", "children", "error")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.started = time.time()
+        self.ended = None
+        self.attrs = attrs
+        self.children = []
+        self.error = None
+
+    def to_dict(self, origin):
+        ended = self.ended if self.ended is not None else time.time()
+        return {
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 1),
+            "duration_ms": round((ended - self.started) * 1000, 1),
+            "running": self.ended is None,
+            "error": self.error,
+            "attrs": self.attrs,
+            "children": [child.to_dict(origin) for child in list(self.children)],
+        }
+
+
+def current_span():
+    return getattr(trace_local, "span", None)
+
+
+@contextmanager
+def span(name, parent=None, **attrs):
+    # Nests under the calling thread's span (or parent); without one the span
+    # starts a new trace in TRACES, e.g. an on-demand venue refresh.
+    parent = parent or current_span()
+    new_span = Span(name, attrs)
+    if parent is None:
+        TRACES.append(new_span)
+    else:
+        parent.children.append(new_span)
+
+    previous, trace_local.span = current_span(), new_span
+    try:
+        yield new_span
+    except Exception as e:
+        new_span.error = str(e)
+        raise
+    finally:
+        new_span.ended = time.time()
+        trace_local.span = previous
+
+
+def trace_attrs(**attrs):
+    active = current_span()
+    if active is not None:
+        active.attrs.update(attrs)
+
+
+def run_in_span(parent, fn, *args):
+    # Thread pool helper: lets worker threads add spans under the submitter's.
+    previous, trace_local.span = current_span(), parent
+    try:
+        return fn(*args)
+    finally:
+        trace_local.span = previous
+
+
 def venue_paths(venue_key):
     venue_dir = os.path.join(SAVE_PATH, venue_key)
     return {
         "dir": venue_dir,
         "excel": os.path.join(venue_dir, "menu.xlsx"),
+        "menu_cache": os.path.join(venue_dir, "menu.cache"),
         "pdf": os.path.join(venue_dir, "menu.pdf"),
+        "previews": os.path.join(venue_dir, "previews"),
+        "render_lock": os.path.join(venue_dir, ".render.lock"),
+    }
+
+
+def variant_pdf_path(venue_key, variant_name):
+    paths = venue_paths(venue_key)
+    if variant_name == DEFAULT_VARIANT:
+        return paths["pdf"]
+    return os.path.join(paths["dir"], f"menu-{variant_name}.pdf")
+
+
+def pdf_exists(pdf_path):
+    return os.path.exists(pdf_path) and os.path.getsize(pdf_path) > 0
+
+
+def variants_ready(venue_key):
+    return tuple(
+        variant_name for variant_name in VENUES[venue_key]["variants"]
+        if pdf_exists(variant_pdf_path(venue_key, variant_name))
+    )
+
+
+def refresh_pdf_ready_flags(venue_keys=None):
+    for venue_key in (VENUES if venue_keys is None else venue_keys):
+        ready = variants_ready(venue_key)
+        update_venue_status(
+            venue_key,
+            variants_ready=ready,
+            pdf_ready=DEFAULT_VARIANT in ready,
+            previews=published_previews(venue_key),
+        )
+
+
+# ======================
+# VENUE REGISTRY
+# ======================
+
+def build_venue(venue_key, raw):
+    for field in ("name", "identifier_env", "password_env"):
+        if not raw.get(field):
+            raise Exception(f"Venue '{venue_key}' missing required field: {field}")
+
+    variants = list(raw.get("variants", [DEFAULT_VARIANT]))
+    unknown_variants = [variant_name for variant_name in variants if variant_name not in MENU_VARIANTS]
+    if unknown_variants:
+        raise Exception(f"Venue '{venue_key}' has unknown variants: {', '.join(unknown_variants)}")
+    if DEFAULT_VARIANT not in variants:
+        variants.insert(0, DEFAULT_VARIANT)
+
+    host = raw.get("host") or f"{venue_key}.choiceqr.com"
+    identifier = os.getenv(raw["identifier_env"])
+    password = os.getenv(raw["password_env"])
+    if raw.get("fallback_credentials", False):
+        identifier = identifier or os.getenv("IDENTIFIER")
+        password = password or os.getenv("PASSWORD")
+
+    login_url = raw.get("login_url") or f"https://{host}/api/auth/local"
+    export_url = raw.get("export_url") or f"https://{host}/api/export/xlsx"
+    referer = raw.get("referer") or f"https://{host}/admin/"
+    if CHOICEQR_BASE_URL:
+        login_url = f"{CHOICEQR_BASE_URL}/{venue_key}/api/auth/local"
+        export_url = f"{CHOICEQR_BASE_URL}/{venue_key}/api/export/xlsx"
+        referer = f"{CHOICEQR_BASE_URL}/{venue_key}/admin/"
+
+    return {
+        "name": raw["name"],
+        "subbrand": raw.get("subbrand", ""),
+        "identifier_env": raw["identifier_env"],
+        "password_env": raw["password_env"],
+        "identifier": identifier,
+        "password": password,
+        "login_url": login_url,
+        "export_url": export_url,
+        "referer": referer,
+        "section_order": list(raw.get("section_order", [])),
+        "excluded_sections": list(raw.get("excluded_sections", [])),
+        "variants": variants,
+        "pdf_optimize": bool(raw.get("pdf_optimize", PDF_OPTIMIZE)),
+        "render_memory_limit_mb": int(raw.get("render_memory_limit_mb", RENDER_MEMORY_LIMIT_MB)),
+        "render_timeout": int(raw.get("render_timeout", RENDER_TIMEOUT)),
     }
 
 
-def refresh_pdf_ready_flags():
-    for venue_key in VENUES:
-        paths = venue_paths(venue_key)
-        STATUS["venues"][venue_key]["pdf_ready"] = os.path.exists(paths["pdf"]) and os.path.getsize(paths["pdf"]) > 0
+def load_venues(path):
+    with open(path, encoding="utf-8") as f:
+        raw_venues = json.load(f)
+
+    if not isinstance(raw_venues, dict):
+        raise Exception("Venues config must be a JSON object keyed by venue key")
+
+    return {venue_key: build_venue(venue_key, raw) for venue_key, raw in raw_venues.items()}
+
+
+LAYOUT_FIELDS = ("name", "subbrand", "section_order", "excluded_sections", "variants", "pdf_optimize")
+
+
+def reload_venues(force=False):
+    # The new registry is built aside and swapped in with a single assignment,
+    # so request threads always see a complete mapping. A broken config keeps
+    # the previous registry.
+    global VENUES, VENUES_MTIME
+
+    with venues_lock:
+        try:
+            mtime = os.path.getmtime(VENUES_CONFIG)
+        except OSError:
+            logging.error(f"Venues config not found: {VENUES_CONFIG}")
+            return False
+
+        if not force and mtime == VENUES_MTIME:
+            return False
+
+        try:
+            venues = load_venues(VENUES_CONFIG)
+        except Exception:
+            logging.exception(f"Failed to load venues config {VENUES_CONFIG}, keeping previous registry")
+            return False
+
+        previous_statuses = STATUS["venues"]
+        added = [venue_key for venue_key in venues if venue_key not in previous_statuses]
+        relayout = [
+            venue_key for venue_key, venue in venues.items()
+            if venue_key in VENUES and any(venue[field] != VENUES[venue_key][field] for field in LAYOUT_FIELDS)
+        ]
+        replace_venue_statuses(venues)
+        VENUES = venues
+        VENUES_MTIME = mtime
+        refresh_pdf_ready_flags(added)
+
+        logging.info(f"Loaded {len(venues)} venues from {VENUES_CONFIG} ({len(added)} new)")
+
+    # Layout-only changes are rendered from the cached menus right away
+    # instead of waiting for the next full cycle.
+    if relayout and STATUS["update_owner"] == NODE_ID:
+        threading.Thread(target=rebuild_menus, args=(relayout,), daemon=True).start()
+
+    return True
 
 
 # ======================
@@ -229,170 +519,270 @@ def download_excel(session, venue_key):
 
     with open(paths["excel"], "wb") as f:
         f.write(response.content)
+    trace_attrs(bytes=len(response.content))
 
     if not os.path.exists(paths["excel"]) or os.path.getsize(paths["excel"]) == 0:
         raise Exception("Excel file corrupted")
 
-    STATUS["venues"][venue_key]["excel_downloaded"] = True
+    update_venue_status(venue_key, excel_downloaded=True)
     logging.info(f"[{venue_key}] ✔ Excel downloaded")
 
 
 # ======================
-# HTML BUILDER
+# MENU MODEL
 # ======================
 
-def build_html(df, venue_key):
-    venue = VENUES[venue_key]
-    section_order = venue.get("section_order", [])
-    excluded_sections = set(venue.get("excluded_sections", []))
+MENU_COLUMNS = ["Section", "Category", "Dish name", "Description", "Price", "Weight, g"]
 
-    def normalize_section(section_name):
-        return " ".join(str(section_name).split()).strip().lower()
 
-    normalized_section_map = {
-        normalize_section(section): section
-        for section in df["Section"].dropna().unique().tolist()
-    }
+class Dish:
+    __slots__ = ("name", "description", "price", "weight")
 
-    if excluded_sections:
-        excluded_normalized = {normalize_section(section) for section in excluded_sections}
-        df = df[~df["Section"].map(normalize_section).isin(excluded_normalized)]
+    def __init__(self, name, description, price, weight):
+        self.name = name
+        self.description = description
+        self.price = price
+        self.weight = weight
 
-    section_order = [
-        normalized_section_map.get(normalize_section(section), section)
-        for section in section_order
-    ]
 
-    def render_item(row):
-        name = html.escape(str(row.get("Dish name", "")).strip())
-        desc = html.escape(str(row.get("Description", "")).strip())
-        price = html.escape(str(row.get("Price", "")).strip())
-        weight = str(row.get("Weight, g", "")).strip()
+class Category:
+    __slots__ = ("name", "dishes")
 
-        if price == "0":
-            price = ""
+    def __init__(self, name):
+        self.name = name
+        self.dishes = []
 
-        desc_html = f'<div class="item-desc">{desc}</div>' if desc else ""
-        weight_html = ""
 
-        if weight and weight.lower() != "nan":
-            weight_html = f'<div class="item-weight">{html.escape(weight)} г</div>'
+class Section:
+    __slots__ = ("name", "categories")
 
-        details_html = ""
-        if desc_html or weight_html:
-            details_html = f'''
-            <div class="item-details">
-                {desc_html}
-                {weight_html}
-            </div>
-            '''
+    def __init__(self, name):
+        self.name = name
+        self.categories = []
 
-        price_html = ""
-        if price:
-            price_html = f'<span class="dots" aria-hidden="true"></span><span class="price">{price}</span>'
 
-        return f"""
-        <div class="item">
-            <div class="item-top">
-                <span class="dish-name">{name}</span>
-                {price_html}
-            </div>
-            {details_html}
-        </div>
-        """
+class Menu:
+    __slots__ = ("sections", "dish_count")
 
-    def render_category(category, items):
-        safe_category = html.escape(str(category).strip())
-        block = f"""
-        <table class="category-card">
-            <thead>
-                <tr>
-                    <th class="cat-header">{safe_category}</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
+    def __init__(self, sections, dish_count):
+        self.sections = sections
+        self.dish_count = dish_count
 
-        for _, row in items.iterrows():
-            block += f"""
-            <tr>
-                <td>{render_item(row)}</td>
-            </tr>
-            """
 
-        block += """
-            </tbody>
-        </table>
-        """
+def normalize_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:  # NaN
+            return ""
+        if value.is_integer():
+            return str(int(value))
+    text = str(value).strip()
+    return "" if text.lower() == "nan" else text
 
-        return block
 
-    html_content = f"""
-    <html>
-    <head>
-    <meta charset="utf-8">
-    <style>
-    @page {{
+def normalize_price(value):
+    price = normalize_cell(value)
+    return "" if price == "0" else price
+
+
+def build_menu(rows):
+    # rows are (section, category, name, description, price, weight) tuples in
+    # export order; sections and categories keep their first-seen order.
+    sections = {}
+    categories = {}
+    values = {}  # shares repeated descriptions, prices and weights
+    dish_count = 0
+
+    for section_name, category_name, name, description, price, weight in rows:
+        section_name = normalize_cell(section_name)
+        if not section_name:
+            continue
+
+        section = sections.get(section_name)
+        if section is None:
+            section = sections[section_name] = Section(sys.intern(section_name))
+
+        category_name = normalize_cell(category_name)
+        category = categories.get((section_name, category_name))
+        if category is None:
+            category = categories[(section_name, category_name)] = Category(sys.intern(category_name))
+            section.categories.append(category)
+
+        description = normalize_cell(description)
+        price = normalize_price(price)
+        weight = normalize_cell(weight)
+        category.dishes.append(Dish(
+            normalize_cell(name),
+            values.setdefault(description, description),
+            values.setdefault(price, price),
+            values.setdefault(weight, weight),
+        ))
+        dish_count += 1
+
+    return Menu(list(sections.values()), dish_count)
+
+
+def parse_menu_excel(excel_path):
+    df = pd.read_excel(excel_path)
+    missing_columns = [column for column in MENU_COLUMNS if column not in df.columns]
+    if missing_columns:
+        raise Exception(f"Excel missing required columns: {', '.join(missing_columns)}")
+
+    return build_menu(zip(*(df[column].tolist() for column in MENU_COLUMNS)))
+
+
+def menu_columns(menu):
+    columns = tuple([] for _ in MENU_COLUMNS)
+    for section in menu.sections:
+        for category in section.categories:
+            for dish in category.dishes:
+                for column, value in zip(columns, (
+                    section.name, category.name, dish.name, dish.description, dish.price, dish.weight,
+                )):
+                    column.append(value)
+    return columns
+
+
+MENU_CACHE = {}
+MENU_CACHE_FORMAT = 2
+
+
+def write_menu_cache(cache_path, version, menu):
+    # gzip'd JSON column arrays: repeated section/category/value strings
+    # compress away, and SAVE_PATH may be shared storage, so the file holds
+    # data only (a pickle there would run code in every replica).
+    tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(
+            {"format": MENU_CACHE_FORMAT, "version": list(version), "columns": menu_columns(menu)},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    os.replace(tmp_path, cache_path)
+
+
+def read_menu_cache(cache_path):
+    # Anything unreadable or of the wrong shape is a miss: load_menu() then
+    # parses the export instead.
+    try:
+        with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+            cached = json.load(f)
+
+        if not isinstance(cached, dict) or cached.get("format") != MENU_CACHE_FORMAT:
+            return None
+        version = tuple(cached["version"])
+        columns = cached["columns"]
+        if (
+            len(version) != 2
+            or not all(isinstance(part, int) for part in version)
+            or len(columns) != len(MENU_COLUMNS)
+            or any(len(column) != len(columns[0]) for column in columns)
+            or not all(isinstance(value, str) for column in columns for value in column)
+        ):
+            return None
+        return version, build_menu(zip(*columns))
+    except Exception:
+        return None
+
+
+def load_menu(venue_key):
+    # Parsed menus are cached per venue in memory and in menu.cache next to
+    # the export, keyed by the export's mtime/size. Without an export the last
+    # cached menu is used, so layouts can be re-rendered without ChoiceQR.
+    paths = venue_paths(venue_key)
+    version = None
+    if os.path.exists(paths["excel"]):
+        stat = os.stat(paths["excel"])
+        version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = MENU_CACHE.get(venue_key)
+    if cached is None or (version is not None and cached[0] != version):
+        cached = read_menu_cache(paths["menu_cache"])
+        if cached is not None:
+            MENU_CACHE[venue_key] = cached
+
+    if cached is not None and (version is None or cached[0] == version):
+        return cached[1]
+
+    if version is None:
+        raise Exception("Excel missing")
+
+    with span("parse", bytes=version[1]) as parse_span:
+        menu = parse_menu_excel(paths["excel"])
+        parse_span.attrs["dishes"] = menu.dish_count
+    MENU_CACHE[venue_key] = (version, menu)
+    write_menu_cache(paths["menu_cache"], version, menu)
+    return menu
+
+
+# ======================
+# HTML BUILDER
+# ======================
+
+MENU_CSS = """
+    @page {
         size: A4;
         margin: 8mm 8mm;
 
-        @bottom-center {{
+        @bottom-center {
             content: counter(page);
             font-size: 9px;
             color: #777;
-        }}
-    }}
+        }
+    }
 
-    body {{
+    body {
         font-family: "DejaVu Sans", sans-serif;
         color: #111;
         margin: 0;
         font-size: 11px;
-    }}
+    }
 
-    .cover-page {{
+    .cover-page {
         page-break-after: always;
         min-height: calc(297mm - 16mm);
         display: flex;
         align-items: center;
         justify-content: center;
-    }}
+    }
 
-    .cover-card {{
+    .cover-card {
         width: 100%;
         border: 1px solid #111;
         border-radius: 10px;
         text-align: center;
         padding: 14px 10px;
         background: linear-gradient(180deg, #ffffff 0%, #f1f1f1 100%);
-    }}
+    }
 
-    .menu-brand {{
+    .menu-brand {
         font-size: 46px;
         font-weight: 900;
         text-transform: uppercase;
         letter-spacing: 2px;
         line-height: 1;
         margin-bottom: 10px;
-    }}
+    }
 
-    .menu-subbrand {{
+    .menu-subbrand {
         font-size: 14px;
         font-weight: 700;
         color: #444;
         text-transform: uppercase;
         letter-spacing: 1px;
-    }}
+    }
 
-    .section-page {{
+    .section-page {
         page-break-before: always;
-    }}
+    }
 
-    .section-page:first-of-type {{
+    .section-page:first-of-type {
         page-break-before: auto;
-    }}
+    }
 
-    .section-title {{
+    .section-title {
         font-size: 18px;
         font-weight: 900;
         text-transform: uppercase;
@@ -403,14 +793,14 @@ def build_html(df, venue_key):
         border-radius: 6px;
         padding: 4px 8px;
         background: #ececec;
-    }}
+    }
 
-    .menu-columns {{
+    .menu-columns {
         column-count: 2;
         column-gap: 6mm;
-    }}
+    }
 
-    .category-card {{
+    .category-card {
         width: 100%;
         border-collapse: separate;
         border-spacing: 0;
@@ -423,13 +813,13 @@ def build_html(df, venue_key):
         box-decoration-break: clone;
         -webkit-box-decoration-break: clone;
         background: #fff;
-    }}
+    }
 
-    .category-card thead {{
+    .category-card thead {
         display: table-header-group;
-    }}
+    }
 
-    .cat-header {{
+    .cat-header {
         text-align: left;
         font-size: 12px;
         font-weight: 900;
@@ -438,34 +828,34 @@ def build_html(df, venue_key):
         padding: 2px 4px;
         background: #f5f5f5;
         border-radius: 3px;
-    }}
+    }
 
-    .category-card td {{
+    .category-card td {
         padding: 0;
-    }}
+    }
 
-    .item {{
+    .item {
         margin-bottom: 4px;
         break-inside: avoid;
-    }}
+    }
 
-    .item-desc {{
+    .item-desc {
         font-size: 8.8px;
         color: #555;
         line-height: 1.15;
         margin-top: 1px;
         flex: 1 1 auto;
         min-width: 0;
-    }}
+    }
 
-    .item-details {{
+    .item-details {
         display: flex;
         align-items: flex-start;
         justify-content: space-between;
         gap: 8px;
-    }}
+    }
 
-    .item-weight {{
+    .item-weight {
         font-size: 9px;
         color: #666;
         margin-top: 1px;
@@ -473,161 +863,713 @@ def build_html(df, venue_key):
         text-align: right;
         white-space: nowrap;
         flex: 0 0 auto;
-    }}
+    }
 
-    .item:last-child {{
+    .item:last-child {
         margin-bottom: 1px;
-    }}
+    }
 
-    .item-top {{
+    .item-top {
         display: flex;
         align-items: baseline;
         gap: 6px;
-    }}
+    }
 
-    .dots {{
+    .dots {
         flex: 1 1 auto;
         border-bottom: 1px dotted #666;
         transform: translateY(-2px);
         min-width: 10px;
-    }}
+    }
 
-    .dish-name {{
+    .dish-name {
         font-size: 12px;
         font-weight: 700;
         line-height: 1.15;
-    }}
+    }
 
-    .price {{
+    .price {
         font-size: 11.6px;
         font-weight: 700;
         white-space: nowrap;
-    }}
+    }
 
-    .item-top:last-child {{
+    .item-top:last-child {
         border-bottom: none;
-    }}
+    }
 
     .menu-columns,
-    .item {{
+    .item {
         orphans: 2;
         widows: 2;
-    }}
+    }
 
-    .menu-columns {{
+    .menu-columns {
         column-fill: auto;
         min-height: 0;
-    }}
+    }
+"""
+
+# Layout variants rendered from the same parsed menu. Each venue lists the
+# ones it needs in venues.json; "a4" is the primary menu.pdf.
+DEFAULT_VARIANT = "a4"
+MENU_VARIANTS = {
+    "a4": {
+        "label": "A4",
+        "show_prices": True,
+        "css": "",
+    },
+    "a5": {
+        "label": "A5 картка",
+        "show_prices": True,
+        "css": """
+    @page {
+        size: A5;
+        margin: 6mm 6mm;
+    }
 
-    </style>
-    </head>
-    <body>
-        <section class="cover-page">
-            <div class="cover-card">
-                <div class="menu-brand">{html.escape(venue['name'])} Menu</div>
-                <div class="menu-subbrand">{html.escape(venue['subbrand'])}</div>
-            </div>
-        </section>
-    """
+    .cover-page {
+        min-height: calc(210mm - 12mm);
+    }
 
-    ordered_df = []
+    .menu-brand {
+        font-size: 32px;
+    }
 
-    for section in section_order:
-        section_df = df[df["Section"] == section]
-        if not section_df.empty:
-            ordered_df.append((section, section_df))
+    .menu-columns {
+        column-count: 1;
+    }
+""",
+    },
+    "large": {
+        "label": "Великий шрифт",
+        "show_prices": True,
+        "css": """
+    body {
+        font-size: 14px;
+    }
 
-    remaining_sections = [s for s in df["Section"].dropna().unique().tolist() if s not in section_order]
-    for section in remaining_sections:
-        section_df = df[df["Section"] == section]
-        if not section_df.empty:
-            ordered_df.append((section, section_df))
+    .menu-columns {
+        column-count: 1;
+    }
 
-    for section, section_df in ordered_df:
-        safe_section = html.escape(str(section).strip())
-        html_content += f"""
-        <section class="section-page">
-            <div class="section-title">{safe_section}</div>
-            <div class="menu-columns">
-        """
+    .section-title {
+        font-size: 24px;
+    }
 
-        for category, items in section_df.groupby("Category", sort=False):
-            html_content += render_category(category, items)
+    .cat-header {
+        font-size: 16px;
+    }
 
-        html_content += """
-            </div>
-        </section>
-        """
+    .dish-name {
+        font-size: 16px;
+    }
 
-    html_content += """
-    </body>
-    </html>
-    """
+    .price {
+        font-size: 15.5px;
+    }
 
-    return html_content
+    .item-desc,
+    .item-weight {
+        font-size: 12px;
+    }
+""",
+    },
+    "banquet": {
+        "label": "Банкет (без цін)",
+        "show_prices": False,
+        "css": "",
+    },
+}
 
 
-# ======================
+def build_html(menu, venue, variant_name=DEFAULT_VARIANT):
+    variant = MENU_VARIANTS[variant_name]
+    section_order = venue.get("section_order", [])
+    excluded_sections = set(venue.get("excluded_sections", []))
+
+    def normalize_section(section_name):
+        return " ".join(str(section_name).split()).strip().lower()
+
+    excluded_normalized = {normalize_section(section) for section in excluded_sections}
+    sections = [
+        section for section in menu.sections
+        if normalize_section(section.name) not in excluded_normalized
+    ]
+
+    def render_item(dish):
+        name = html.escape(dish.name)
+        desc = html.escape(dish.description)
+        price = html.escape(dish.price)
+        weight = dish.weight
+
+        desc_html = f'<div class="item-desc">{desc}</div>' if desc else ""
+        weight_html = ""
+
+        if weight:
+            weight_html = f'<div class="item-weight">{html.escape(weight)} г</div>'
+
+        details_html = ""
+        if desc_html or weight_html:
+            details_html = f'''
+            <div class="item-details">
+                {desc_html}
+                {weight_html}
+            </div>
+            '''
+
+        price_html = ""
+        if price and variant["show_prices"]:
+            price_html = f'<span class="dots" aria-hidden="true"></span><span class="price">{price}</span>'
+
+        return f"""
+        <div class="item">
+            <div class="item-top">
+                <span class="dish-name">{name}</span>
+                {price_html}
+            </div>
+            {details_html}
+        </div>
+        """
+
+    def render_category(category):
+        safe_category = html.escape(category.name)
+        block = f"""
+        <table class="category-card">
+            <thead>
+                <tr>
+                    <th class="cat-header">{safe_category}</th>
+                </tr>
+            </thead>
+            <tbody>
+        """
+
+        for dish in category.dishes:
+            block += f"""
+            <tr>
+                <td>{render_item(dish)}</td>
+            </tr>
+            """
+
+        block += """
+            </tbody>
+        </table>
+        """
+
+        return block
+
+    html_content = f"""
+    <html>
+    <head>
+    <meta charset="utf-8">
+    <style>
+    {MENU_CSS}
+    {variant["css"]}
+    </style>
+    </head>
+    <body>
+        <section class="cover-page">
+            <div class="cover-card">
+                <div class="menu-brand">{html.escape(venue['name'])} Menu</div>
+                <div class="menu-subbrand">{html.escape(venue['subbrand'])}</div>
+            </div>
+        </section>
+    """
+
+    # Distinct sections can share a normalized name ("Бар" / "бар"); all of
+    # them follow that name's position.
+    sections_by_name = {}
+    for section in sections:
+        sections_by_name.setdefault(normalize_section(section.name), []).append(section)
+    ordered_sections = []
+
+    for section_name in section_order:
+        ordered_sections.extend(sections_by_name.pop(normalize_section(section_name), []))
+
+    ordered_sections.extend(
+        section for section in sections
+        if normalize_section(section.name) in sections_by_name
+    )
+
+    for section in ordered_sections:
+        safe_section = html.escape(section.name)
+        html_content += f"""
+        <section class="section-page">
+            <div class="section-title">{safe_section}</div>
+            <div class="menu-columns">
+        """
+
+        for category in section.categories:
+            html_content += render_category(category)
+
+        html_content += """
+            </div>
+        </section>
+        """
+
+    html_content += """
+    </body>
+    </html>
+    """
+
+    return html_content
+
+
+# ======================
 # GENERATE PDF
 # ======================
 
+def render_pdf_sandboxed(html_content, pdf_path, venue, preview_dir=None):
+    memory_limit_mb = venue["render_memory_limit_mb"]
+    timeout = venue["render_timeout"]
+
+    args = [
+        sys.executable, RENDER_SANDBOX_SCRIPT, pdf_path, str(memory_limit_mb),
+        "1" if venue["pdf_optimize"] else "0",
+    ]
+    if preview_dir:
+        args += [preview_dir, str(PREVIEW_PAGES)]
+
+    try:
+        result = subprocess.run(
+            args,
+            input=html_content.encode("utf-8"),
+            capture_output=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        raise Exception(f"PDF generation timed out after {timeout}s")
+
+    try:
+        report = json.loads(result.stdout or b"{}")
+    except ValueError:
+        report = {}
+
+    peak_rss_kb = report.get("peak_rss_kb")
+    stats = {
+        "seconds": report.get("seconds") or 0.0,
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1) if peak_rss_kb else None,
+        "optimize": report.get("optimize"),
+        "previews": report.get("previews"),
+    }
+
+    if result.returncode == 0:
+        return stats
+
+    if report.get("error") == "memory":
+        raise Exception(f"PDF generation ran out of memory (limit {memory_limit_mb} MB)")
+    if report.get("error"):
+        raise Exception(f"PDF generation error: {report['error']}")
+    if result.returncode < 0:
+        raise Exception(
+            f"PDF generation killed by signal {-result.returncode}"
+            f" (memory limit {memory_limit_mb} MB)"
+        )
+
+    stderr_tail = result.stderr.decode("utf-8", "replace").strip().splitlines()[-1:]
+    raise Exception(f"PDF generation failed: {' '.join(stderr_tail) or result.returncode}")
+
+
+render_budget = threading.Condition()
+RENDER_MEMORY_RESERVED_MB = 0
+
+
+@contextmanager
+def render_memory_slot(memory_limit_mb):
+    # A render without a limit, or above the whole budget, runs alone.
+    global RENDER_MEMORY_RESERVED_MB
+
+    memory_mb = min(memory_limit_mb or RENDER_MEMORY_BUDGET_MB, RENDER_MEMORY_BUDGET_MB)
+    with render_budget, span("render slot", memory_mb=memory_mb):
+        render_budget.wait_for(lambda: RENDER_MEMORY_RESERVED_MB + memory_mb <= RENDER_MEMORY_BUDGET_MB)
+        RENDER_MEMORY_RESERVED_MB += memory_mb
+
+    try:
+        yield
+    finally:
+        with render_budget:
+            RENDER_MEMORY_RESERVED_MB -= memory_mb
+            render_budget.notify_all()
+
+
+def render_pdf(html_content, pdf_path, venue, sandbox=None, preview_dir=None):
+    # Render next to the published file and swap it in only on success, so a
+    # failed render keeps serving the previous good PDF.
+    tmp_pdf = f"{pdf_path}.{threading.get_ident()}.tmp"
+    if os.path.exists(tmp_pdf):
+        os.remove(tmp_pdf)
+
+    try:
+        with render_memory_slot(venue["render_memory_limit_mb"]), span("write_pdf", html_bytes=len(html_content)):
+            if RENDER_SANDBOX if sandbox is None else sandbox:
+                render_stats = render_pdf_sandboxed(html_content, tmp_pdf, venue, preview_dir)
+            else:
+                started = time.monotonic()
+                try:
+                    HTML(string=html_content).write_pdf(tmp_pdf)
+                except Exception as e:
+                    raise Exception(f"PDF generation error: {str(e)}")
+                render_stats = {
+                    "seconds": time.monotonic() - started,
+                    "peak_rss_mb": None,
+                    "optimize": optimize_pdf(tmp_pdf) if venue["pdf_optimize"] else None,
+                }
+                if preview_dir:
+                    render_stats["previews"] = render_previews(tmp_pdf, preview_dir, PREVIEW_PAGES)
+
+        if not os.path.exists(tmp_pdf) or os.path.getsize(tmp_pdf) == 0:
+            raise Exception("PDF generation failed")
+
+        render_stats["bytes"] = os.path.getsize(tmp_pdf)
+        trace_attrs(bytes=render_stats["bytes"], peak_rss_mb=render_stats["peak_rss_mb"])
+
+        with span("publish", file=os.path.basename(pdf_path)):
+            os.replace(tmp_pdf, pdf_path)
+    finally:
+        if os.path.exists(tmp_pdf):
+            os.remove(tmp_pdf)
+
+    return render_stats
+
+
+def render_variant_pdf(variant_name, html_content, pdf_path, venue, preview_dir=None):
+    with span(f"render {variant_name}", variant=variant_name):
+        return render_pdf(html_content, pdf_path, venue, preview_dir=preview_dir)
+
+
+def published_previews(venue_key):
+    # The newest preview set on disk; sets are named by the PDF they show.
+    try:
+        sets = [
+            entry for entry in os.scandir(venue_paths(venue_key)["previews"])
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
+    except OSError:
+        return None
+    if not sets:
+        return None
+
+    latest = max(sets, key=lambda entry: entry.stat().st_mtime_ns)
+    pages = sum(1 for name in os.listdir(latest.path) if name.endswith(".webp"))
+    return {"version": latest.name, "pages": pages}
+
+
+def publish_previews(venue_key, tmp_dir):
+    # Keyed by the content of the published PDF, so a set never changes under
+    # its URL and can be cached forever.
+    previews_dir = venue_paths(venue_key)["previews"]
+    with open(variant_pdf_path(venue_key, DEFAULT_VARIANT), "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:16]
+
+    target = os.path.join(previews_dir, version)
+    if os.path.isdir(target):
+        shutil.rmtree(tmp_dir)
+        os.utime(target)  # unchanged menu: make it the newest set again
+    else:
+        os.replace(tmp_dir, target)
+
+    sets = sorted(
+        (entry for entry in os.scandir(previews_dir) if entry.is_dir() and not entry.name.startswith(".")),
+        key=lambda entry: entry.stat().st_mtime_ns,
+    )
+    for entry in sets[:-PREVIEW_KEEP]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
 def generate_menu_pdf(venue_key):
-    paths = venue_paths(venue_key)
+    venue = VENUES[venue_key]
 
-    if not os.path.exists(paths["excel"]):
-        raise Exception("Excel missing")
+    # One parse feeds every variant; the renders run side by side.
+    menu = load_menu(venue_key)
+    html_by_variant = {}
+    for variant_name in venue["variants"]:
+        with span("build_html", variant=variant_name) as build_span:
+            html_by_variant[variant_name] = build_html(menu, venue, variant_name)
+            build_span.attrs["bytes"] = len(html_by_variant[variant_name])
+
+    # Previews of the primary PDF are rasterized by the same render job and
+    # published next to it.
+    preview_tmp = None
+    if PREVIEW_PAGES:
+        preview_tmp = os.path.join(venue_paths(venue_key)["previews"], f".tmp-{threading.get_ident()}")
+        shutil.rmtree(preview_tmp, ignore_errors=True)
+
+    started = time.monotonic()
+    parent = current_span()
+    try:
+        with ThreadPoolExecutor(max_workers=RENDER_VARIANT_WORKERS) as executor:
+            futures = {
+                variant_name: executor.submit(
+                    run_in_span, parent, render_variant_pdf,
+                    variant_name, html_content, variant_pdf_path(venue_key, variant_name), venue,
+                    preview_tmp if variant_name == DEFAULT_VARIANT else None,
+                )
+                for variant_name, html_content in html_by_variant.items()
+            }
 
-    df = pd.read_excel(paths["excel"])
-    required_columns = ["Section", "Category", "Dish name", "Description", "Price", "Weight, g"]
-    missing_columns = [column for column in required_columns if column not in df.columns]
-    if missing_columns:
-        raise Exception(f"Excel missing required columns: {', '.join(missing_columns)}")
+        render_stats = {}
+        errors = {}
+        for variant_name, future in futures.items():
+            try:
+                render_stats[variant_name] = future.result()
+            except Exception as e:
+                errors[variant_name] = str(e)
 
-    df = df[df["Section"].notna()]
-    df = df.fillna("")
+        previews = (render_stats.get(DEFAULT_VARIANT) or {}).get("previews")
+        if previews and previews["pages"] and not previews["error"]:
+            try:
+                publish_previews(venue_key, preview_tmp)
+            except OSError:
+                logging.exception(f"[{venue_key}] Failed to publish previews")
+    finally:
+        if preview_tmp:
+            shutil.rmtree(preview_tmp, ignore_errors=True)
 
-    html_content = build_html(df, venue_key)
+    update_venue_status(
+        venue_key,
+        variants_ready=variants_ready(venue_key),
+        previews=published_previews(venue_key),
+    )
 
-    if os.path.exists(paths["pdf"]):
-        os.remove(paths["pdf"])
+    if DEFAULT_VARIANT in errors:
+        raise Exception(errors[DEFAULT_VARIANT])
+
+    peak_rss = [stats["peak_rss_mb"] for stats in render_stats.values() if stats["peak_rss_mb"]]
+    render_seconds = round(time.monotonic() - started, 2)
+    render_peak_rss_mb = max(peak_rss) if peak_rss else None
+    update_venue_status(
+        venue_key,
+        pdf_generated=True,
+        pdf_ready=True,
+        render_seconds=render_seconds,
+        render_peak_rss_mb=render_peak_rss_mb,
+        pdf_bytes={
+            variant_name: {
+                "before": (stats["optimize"] or {}).get("bytes_before", stats["bytes"]),
+                "after": stats["bytes"],
+            }
+            for variant_name, stats in render_stats.items()
+        },
+    )
+    logging.info(
+        f"[{venue_key}] ✔ PDF generated: {', '.join(render_stats)}"
+        f" in {render_seconds:.2f}s"
+        f" (peak RSS {render_peak_rss_mb} MB)"
+    )
 
+    if errors:
+        raise Exception("; ".join(f"{variant_name}: {error}" for variant_name, error in errors.items()))
+
+
+# ======================
+# UPDATE LEASE
+# ======================
+
+def lease_connection():
+    os.makedirs(os.path.dirname(LEASE_DB) or ".", exist_ok=True)
+    conn = sqlite3.connect(LEASE_DB, timeout=10, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS lease ("
+        "name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS refresh_queue ("
+        "venue_key TEXT PRIMARY KEY, first_at REAL NOT NULL, due_at REAL NOT NULL)"
+    )
+    return conn
+
+
+def acquire_update_lease():
+    # Takes the lease if it is free or expired, renews it if we already own it.
+    if not LEASE_DB:
+        update_status(update_owner=NODE_ID)
+        return True
+
+    now = time.time()
     try:
-        HTML(string=html_content).write_pdf(paths["pdf"])
-    except Exception as e:
-        raise Exception(f"PDF generation error: {str(e)}")
+        conn = lease_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner, expires_at FROM lease WHERE name = 'update'").fetchone()
+
+            if row and row[0] != NODE_ID and row[1] > now:
+                conn.execute("COMMIT")
+                update_status(update_owner=row[0])
+                return False
+
+            conn.execute(
+                "INSERT OR REPLACE INTO lease (name, owner, expires_at) VALUES ('update', ?, ?)",
+                (NODE_ID, now + LEASE_TTL),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        # Without a renewal another replica may take over within LEASE_TTL,
+        # so stop acting as the owner (on-demand and webhook jobs) right away.
+        logging.exception("Update lease check failed")
+        update_status(update_owner=None)
+        return False
+
+    if STATUS["update_owner"] != NODE_ID:
+        logging.info(f"Acquired update lease as {NODE_ID}")
+    update_status(update_owner=NODE_ID)
+    return True
+
+
+def release_update_lease():
+    if not LEASE_DB or STATUS["update_owner"] != NODE_ID:
+        return
+
+    try:
+        conn = lease_connection()
+        try:
+            conn.execute("DELETE FROM lease WHERE name = 'update' AND owner = ?", (NODE_ID,))
+        finally:
+            conn.close()
+    except (sqlite3.Error, OSError):
+        logging.exception("Update lease release failed")
+
+
+def release_lease_and_exit(signum, frame):
+    release_update_lease()
+    sys.exit(0)
 
-    if not os.path.exists(paths["pdf"]) or os.path.getsize(paths["pdf"]) == 0:
-        raise Exception("PDF generation failed")
 
-    STATUS["venues"][venue_key]["pdf_generated"] = True
-    STATUS["venues"][venue_key]["pdf_ready"] = True
-    logging.info(f"[{venue_key}] ✔ PDF generated")
+def lease_worker():
+    # Renews often enough that a live owner never expires; standby replicas
+    # take over within LEASE_TTL of the owner dying.
+    while True:
+        time.sleep(max(1, LEASE_TTL // 3))
+        was_owner = STATUS["update_owner"] == NODE_ID
+        if not acquire_update_lease():
+            # Standby replicas serve whatever the owner publishes to SAVE_PATH.
+            refresh_pdf_ready_flags()
+        elif not was_owner:
+            # Taken over from a dead or redeployed owner, whose last cycle
+            # may be hours old: refresh now instead of at our next tick.
+            threading.Thread(target=update_menu, daemon=True).start()
 
 
 # ======================
 # UPDATE MENU
 # ======================
 
-def update_venue_menu(venue_key):
-    venue_status = STATUS["venues"][venue_key]
-    previous_pdf_ready = venue_status.get("pdf_ready", False)
+@contextmanager
+def venue_render_lock(venue_key):
+    # Serializes export downloads and renders of one venue across threads and
+    # processes (a --rebuild next to the server, replicas on shared storage):
+    # flock() locks belong to the open file, so every holder opens its own.
+    # Whoever renders last also reads the newest export, so a rebuild of the
+    # cached menu can never publish over a fresher PDF.
+    paths = venue_paths(venue_key)
+    os.makedirs(paths["dir"], exist_ok=True)
+    with open(paths["render_lock"], "a") as lock_file:
+        with span("render lock"):
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-    venue_status.update({
-        "error": None,
-        "excel_downloaded": False,
-        "pdf_generated": False,
-        "pdf_ready": previous_pdf_ready,
-        "last_attempt": now_kyiv(),
-    })
+
+def update_venue_menu(venue_key):
+    update_venue_status(
+        venue_key,
+        error=None,
+        excel_downloaded=False,
+        pdf_generated=False,
+        last_attempt=now_kyiv(),
+    )
 
     paths = venue_paths(venue_key)
     os.makedirs(paths["dir"], exist_ok=True)
 
-    with login_and_get_session(venue_key) as session:
-        download_excel(session, venue_key)
+    with span(f"venue {venue_key}", venue=venue_key):
+        with span("login"):
+            session = login_and_get_session(venue_key)
+
+        with venue_render_lock(venue_key):
+            with session, span("download"):
+                download_excel(session, venue_key)
+
+            try:
+                generate_menu_pdf(venue_key)
+            finally:
+                # The fresh export reached menu.pdf even if a secondary
+                # variant failed afterwards.
+                venue_status = STATUS["venues"].get(venue_key)
+                if venue_status is not None and venue_status["pdf_generated"]:
+                    update_venue_status(venue_key, last_primary_success=now_kyiv())
+        update_venue_status(venue_key, last_success=now_kyiv())
+
 
-    generate_menu_pdf(venue_key)
-    venue_status["last_success"] = now_kyiv()
+def update_venue_menu_safe(venue_key):
+    try:
+        update_venue_menu(venue_key)
+        update_venue_status(venue_key, failed_attempts=0)
+    except Exception as e:
+        # A no-op if the venue was dropped by a config reload mid-cycle.
+        venue_status = STATUS["venues"].get(venue_key)
+        failed_attempts = venue_status["failed_attempts"] + 1 if venue_status is not None else 1
+        update_venue_status(venue_key, error=str(e), failed_attempts=failed_attempts)
+        logging.exception(f"[{venue_key}] Update failed")
+
+
+venue_jobs_lock = threading.Lock()
+VENUE_JOBS = {}
+on_demand_executor = ThreadPoolExecutor(max_workers=ON_DEMAND_WORKERS)
+
+
+def start_venue_update(venue_key, executor):
+    # Single-flight: while a venue is refreshing, every caller gets the same
+    # future instead of starting another login/download/render.
+    with venue_jobs_lock:
+        future = VENUE_JOBS.get(venue_key)
+        if future is not None:
+            return future
+
+        future = executor.submit(run_in_span, current_span(), update_venue_menu_safe, venue_key)
+        VENUE_JOBS[venue_key] = future
+
+    def forget(done):
+        with venue_jobs_lock:
+            if VENUE_JOBS.get(venue_key) is done:
+                del VENUE_JOBS[venue_key]
+
+    future.add_done_callback(forget)
+    return future
+
+
+def on_demand_update(venue_key, variant_name):
+    # Returns the in-flight job if this request should wait for one.
+    if not ON_DEMAND_RENDER or STATUS["update_owner"] != NODE_ID:
+        return None
+
+    venue_status = STATUS["venues"][venue_key]
+    now = now_kyiv()
+    ready = variant_name in venue_status["variants_ready"]
+    # Freshness is that of menu.pdf: a failing secondary variant leaves
+    # last_success unset but must not make every download a full refresh.
+    last_fresh = venue_status["last_primary_success"]
+    stale = last_fresh is not None and now - last_fresh > timedelta(seconds=ON_DEMAND_MAX_AGE)
+
+    if ready and not stale:
+        return None
+
+    # Retries of a failing venue back off exponentially, up to 64x.
+    last_attempt = venue_status["last_attempt"]
+    retry_after = ON_DEMAND_RETRY_AFTER * 2 ** min(max(venue_status["failed_attempts"] - 1, 0), 6)
+    if (
+        venue_key not in VENUE_JOBS
+        and venue_status["error"]
+        and last_attempt is not None
+        and now - last_attempt < timedelta(seconds=retry_after)
+    ):
+        return None
+
+    future = start_venue_update(venue_key, on_demand_executor)
+    return None if ready else future
 
 
 def update_menu():
@@ -635,420 +1577,523 @@ def update_menu():
         logging.warning("Update already running")
         return
 
-    logging.info("=== START UPDATE ===")
-
     try:
+        if not acquire_update_lease():
+            logging.info(f"Update lease held by {STATUS['update_owner'] or 'nobody reachable'}, serving published menus")
+            refresh_pdf_ready_flags()
+            update_status(next_update=now_kyiv() + timedelta(seconds=UPDATE_INTERVAL))
+            return
+
+        logging.info("=== START UPDATE ===")
+        started = time.monotonic()
+
         os.makedirs(SAVE_PATH, exist_ok=True)
 
-        for venue_key in VENUES:
-            try:
-                update_venue_menu(venue_key)
-            except Exception as e:
-                STATUS["venues"][venue_key]["error"] = str(e)
-                logging.exception(f"[{venue_key}] Update failed")
+        with span("update cycle", venues=len(VENUES)):
+            with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+                wait([start_venue_update(venue_key, executor) for venue_key in list(VENUES)])
 
-        STATUS["last_update"] = now_kyiv()
-        STATUS["next_update"] = now_kyiv() + timedelta(seconds=UPDATE_INTERVAL)
+        update_status(
+            last_update=now_kyiv(),
+            next_update=now_kyiv() + timedelta(seconds=UPDATE_INTERVAL),
+        )
 
-        logging.info("=== UPDATE COMPLETE ===")
+        logging.info(f"=== UPDATE COMPLETE in {time.monotonic() - started:.1f}s ===")
 
+    except OSError:
+        # e.g. shared storage gone; background_worker must survive to retry.
+        logging.exception("Update cycle failed")
+        update_status(next_update=now_kyiv() + timedelta(seconds=UPDATE_INTERVAL))
     finally:
         update_lock.release()
 
 
 # ======================
-# ROUTES
+# WEBHOOK REFRESH
 # ======================
 
-@app.route("/")
-def index():
-    venue_cards = [
-        {
-            "key": venue_key,
-            "name": VENUES[venue_key]["name"],
-        }
-        for venue_key in VENUES
-    ]
+# Pending refreshes live in the lease database so a webhook can land on any
+# replica while only the lease owner renders; single nodes keep them in
+# memory. Every signal pushes the refresh back by WEBHOOK_DEBOUNCE, but never
+# past WEBHOOK_MAX_DELAY after the first one.
 
-    return render_template_string("""
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <style>
-            body {
-                margin: 0;
-                padding: 36px 18px;
-                background: radial-gradient(circle at top, #f9fafb 0%, #eef2ff 45%, #e2e8f0 100%);
-                font-family: Arial, sans-serif;
-                color: #171717;
-            }
+refresh_queue_lock = threading.Lock()
+REFRESH_QUEUE = {}
 
-            .layout {
-                max-width: 980px;
-                margin: 0 auto;
-            }
 
-            .hero {
-                background: linear-gradient(145deg, #ffffff, #f8fafc);
-                border: 1px solid #dbe2ea;
-                border-radius: 18px;
-                box-shadow: 0 10px 30px rgba(15, 23, 42, 0.08);
-                padding: 28px 24px;
-                text-align: center;
-                margin-bottom: 20px;
-            }
+def queue_venue_refresh(venue_key):
+    now = time.time()
+    if not LEASE_DB:
+        with refresh_queue_lock:
+            first_at = REFRESH_QUEUE.get(venue_key, (now, None))[0]
+            due_at = min(now + WEBHOOK_DEBOUNCE, first_at + WEBHOOK_MAX_DELAY)
+            REFRESH_QUEUE[venue_key] = (first_at, due_at)
+        return due_at
 
-            h1 {
-                margin: 0;
-            }
+    conn = lease_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT first_at FROM refresh_queue WHERE venue_key = ?", (venue_key,)).fetchone()
+        first_at = row[0] if row else now
+        due_at = min(now + WEBHOOK_DEBOUNCE, first_at + WEBHOOK_MAX_DELAY)
+        conn.execute(
+            "INSERT OR REPLACE INTO refresh_queue (venue_key, first_at, due_at) VALUES (?, ?, ?)",
+            (venue_key, first_at, due_at),
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return due_at
 
-            .subtitle {
-                font-size: 13px;
-                color: #666;
-                margin-top: 4px;
-                margin-bottom: 10px;
-                text-transform: uppercase;
-                letter-spacing: 0.7px;
-            }
 
-            .intro {
-                margin: 0;
-                color: #444;
-                font-size: 14px;
-            }
+def pop_due_refreshes():
+    now = time.time()
+    if not LEASE_DB:
+        with refresh_queue_lock:
+            due = [venue_key for venue_key, (_, due_at) in REFRESH_QUEUE.items() if due_at <= now]
+            for venue_key in due:
+                del REFRESH_QUEUE[venue_key]
+        return due
 
-            .venues-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(210px, 1fr));
-                gap: 14px;
-                margin-bottom: 20px;
-            }
+    conn = lease_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        due = [row[0] for row in conn.execute("SELECT venue_key FROM refresh_queue WHERE due_at <= ?", (now,))]
+        conn.execute("DELETE FROM refresh_queue WHERE due_at <= ?", (now,))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return due
 
-            .venue-card {
-                background: #ffffffd1;
-                backdrop-filter: blur(2px);
-                border: 1px solid #d9e0ea;
-                border-radius: 14px;
-                padding: 14px;
-                box-shadow: 0 8px 18px rgba(15, 23, 42, 0.06);
-            }
 
-            .venue-title {
-                margin: 0 0 10px 0;
-                font-size: 18px;
-            }
+def refresh_worker():
+    while True:
+        time.sleep(1)
+        if STATUS["update_owner"] != NODE_ID:
+            continue
+
+        try:
+            due = pop_due_refreshes()
+        except (sqlite3.Error, OSError):
+            logging.exception("Refresh queue check failed")
+            continue
+
+        for venue_key in due:
+            if venue_key not in VENUES:
+                continue
+
+            # A running job may have fetched the export before this edit, so
+            # the signal waits for a job of its own.
+            with venue_jobs_lock:
+                busy = venue_key in VENUE_JOBS
+            if busy:
+                try:
+                    queue_venue_refresh(venue_key)
+                except (sqlite3.Error, OSError):
+                    logging.exception(f"[{venue_key}] Failed to re-queue webhook refresh")
+                continue
+
+            logging.info(f"[{venue_key}] Webhook refresh")
+            start_venue_update(venue_key, on_demand_executor)
 
-            .download-btn {
-                border: none;
-                background: linear-gradient(145deg, #111827, #1f2937);
-                color: #fff;
-                font-size: 14px;
-                border-radius: 10px;
-                padding: 10px 12px;
-                cursor: pointer;
-                font-weight: 700;
-                width: 100%;
-            }
 
-            .download-btn:hover {
-                background: linear-gradient(145deg, #1f2937, #374151);
-            }
+# ======================
+# MENU BUNDLE
+# ======================
 
-            .download-btn:disabled {
-                opacity: 0.7;
-                cursor: wait;
-            }
+BUNDLE_DIR = os.path.join(SAVE_PATH, "_bundles")
+BUNDLE_CHUNK_SIZE = 64 * 1024
+BUNDLE_KEEP = 4
 
-            .status-row {
-                margin-top: 10px;
-                display: flex;
-                align-items: center;
-                gap: 8px;
-            }
 
-            .status-light {
-                width: 12px;
-                height: 12px;
-                border-radius: 999px;
-                border: 1px solid #a8a8a8;
-                background: #9ca3af;
-                box-shadow: 0 0 0 3px rgba(148, 163, 184, 0.17);
-            }
+class ChunkSink(io.RawIOBase):
+    # Write-only stream that hands ZipFile output back in chunks and tees it
+    # into the bundle cache file.
+    def __init__(self, cache_file):
+        self.chunks = []
+        self.cache_file = cache_file
 
-            .status-ok {
-                background: #16a34a;
-                box-shadow: 0 0 0 3px rgba(34, 197, 94, 0.18);
-                border-color: #15803d;
-            }
+    def writable(self):
+        return True
 
-            .status-busy {
-                background: #f59e0b;
-                box-shadow: 0 0 0 3px rgba(245, 158, 11, 0.2);
-                border-color: #b45309;
-            }
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.cache_file.write(data)
+        return len(data)
 
-            .status-error {
-                background: #dc2626;
-                box-shadow: 0 0 0 3px rgba(248, 113, 113, 0.2);
-                border-color: #b91c1c;
-            }
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
 
-            .status-label {
-                font-size: 12px;
-                font-weight: 700;
-                color: #334155;
-            }
 
-            .ready-badge,
-            .pending-badge,
-            .error-badge {
-                margin-top: 10px;
-                font-size: 12px;
-                font-weight: 700;
-            }
+def bundle_entries(include_xlsx):
+    entries = []
+    for venue_key, venue_status in STATUS["venues"].items():
+        if venue_key not in VENUES:
+            continue
+
+        for variant_name in venue_status["variants_ready"]:
+            arcname = f"menu-{venue_key}.pdf"
+            if variant_name != DEFAULT_VARIANT:
+                arcname = f"menu-{venue_key}-{variant_name}.pdf"
+            entries.append((arcname, variant_pdf_path(venue_key, variant_name)))
+
+        if include_xlsx:
+            entries.append((f"menu-{venue_key}.xlsx", venue_paths(venue_key)["excel"]))
+
+    # Files can vanish between a status change and the request; the version
+    # covers exactly what gets archived.
+    versioned = []
+    for arcname, path in entries:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        versioned.append((arcname, path, stat))
+
+    version = hashlib.sha256(
+        "\n".join(f"{arcname}:{stat.st_mtime_ns}:{stat.st_size}" for arcname, _, stat in versioned).encode("utf-8")
+    ).hexdigest()[:24]
+    return versioned, version
+
+
+def prune_bundles(keep_path):
+    bundles = sorted(
+        (os.path.join(BUNDLE_DIR, name) for name in os.listdir(BUNDLE_DIR) if name.endswith(".zip")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    for path in bundles[BUNDLE_KEEP:]:
+        if path != keep_path:
+            os.remove(path)
 
-            .ready-badge { color: #0a6e35; }
 
-            .pending-badge { color: #8a6c00; }
+def stream_bundle(entries, bundle_path):
+    # ZIP_STORED: PDFs are already compressed, so entries are copied as-is.
+    tmp_path = f"{bundle_path}.{threading.get_ident()}.tmp"
+    completed = False
 
-            .error-badge { color: #b91c1c; }
+    try:
+        with open(tmp_path, "wb") as cache_file:
+            sink = ChunkSink(cache_file)
+            with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+                for arcname, path, stat in entries:
+                    info = zipfile.ZipInfo(arcname, date_time=time.localtime(stat.st_mtime)[:6])
+                    info.file_size = stat.st_size
+                    with open(path, "rb") as source, archive.open(info, "w") as target:
+                        while True:
+                            chunk = source.read(BUNDLE_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            target.write(chunk)
+                            yield from sink.drain()
+                    yield from sink.drain()
+            yield from sink.drain()
+
+        os.replace(tmp_path, bundle_path)
+        completed = True
+        prune_bundles(bundle_path)
+    finally:
+        if not completed and os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-            .guide {
-                background: #fff;
-                border: 1px solid #d4d4d4;
-                border-radius: 16px;
-                box-shadow: 0 8px 25px rgba(0, 0, 0, 0.07);
-                padding: 20px 24px;
-            }
 
-            .guide h2 {
-                margin-top: 0;
-                margin-bottom: 8px;
-                font-size: 20px;
-            }
+# ======================
+# REBUILD
+# ======================
 
-            .guide ol {
-                margin: 10px 0 0 18px;
-                padding: 0;
-                color: #333;
-                font-size: 14px;
-                line-height: 1.45;
-            }
+def rebuild_venue_pdf(venue_key):
+    try:
+        with span(f"venue {venue_key}", venue=venue_key), venue_render_lock(venue_key):
+            generate_menu_pdf(venue_key)
+        update_venue_status(venue_key, error=None)
+        return True
+    except Exception as e:
+        update_venue_status(venue_key, error=str(e))
+        logging.exception(f"[{venue_key}] Rebuild failed")
+        return False
+
+
+def rebuild_menus(venue_keys=None):
+    # Re-renders PDFs from the cached parsed menus only: no login, no export.
+    venue_keys = list(VENUES if venue_keys is None else venue_keys)
+    logging.info(f"=== START REBUILD ({len(venue_keys)} venues) ===")
+    started = time.monotonic()
+
+    with span("rebuild", venues=len(venue_keys)) as rebuild_span:
+        with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+            results = list(executor.map(
+                lambda venue_key: run_in_span(rebuild_span, rebuild_venue_pdf, venue_key), venue_keys
+            ))
+
+    logging.info(
+        f"=== REBUILD COMPLETE in {time.monotonic() - started:.1f}s:"
+        f" {sum(results)}/{len(results)} venues ==="
+    )
+    return all(results)
 
-            .countdown {
-                margin-top: 12px;
-                font-size: 13px;
-                color: #555;
-                font-weight: 600;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="layout">
-            <section class="hero">
-                <h1>ChoiceQR Menu Export</h1>
-                <div class="subtitle">Офіційні PDF меню закладів</div>
-                <p class="intro">Кожен заклад винесений в окрему картку для швидкого завантаження потрібного меню.</p>
-                <div id="excel-countdown" class="countdown">До наступного завантаження Excel: оновлення виконується</div>
-            </section>
-
-            <section class="venues-grid">
-                {% for venue in venue_cards %}
-                <article class="venue-card" data-venue="{{ venue.key }}">
-                    <h3 class="venue-title">{{ venue.name }}</h3>
-                    <button type="button" class="download-btn" data-download="{{ venue.key }}">Завантажити PDF меню</button>
-                    <div class="status-row">
-                        <span class="status-light" data-light="{{ venue.key }}"></span>
-                        <span class="status-label" data-label="{{ venue.key }}">Перевіряємо статус...</span>
-                    </div>
-                    <div class="pending-badge" data-message="{{ venue.key }}">Оновлення статусу...</div>
-                </article>
-                {% endfor %}
-            </section>
-
-            <section class="guide">
-                <h2>Інструкція користування сайтом</h2>
-                <ol>
-                    <li>Оберіть картку потрібного закладу.</li>
-                    <li>Натисніть кнопку <b>«Завантажити PDF меню»</b>.</li>
-                    <li>Відкрийте завантажений файл або одразу передайте його гостю.</li>
-                    <li>Якщо меню ще оновлюється, зачекайте до завершення таймера і повторіть спробу.</li>
-                </ol>
-            </section>
-        </div>
 
-        <script>
-            let countdownSeconds = 0;
+# ======================
+# ROUTES
+# ======================
 
-            function formatCountdown(seconds) {
-                if (!seconds || seconds <= 0) {
-                    return "оновлення виконується";
-                }
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+STATIC_MAX_AGE = 365 * 24 * 3600
+STATIC_ASSETS = {}
+INDEX_CACHE = {}
+index_template = app.jinja_env.get_template("index.html")
 
-                const hours = Math.floor(seconds / 3600);
-                const minutes = Math.floor((seconds % 3600) / 60);
-                const secs = seconds % 60;
-                return `${String(hours).padStart(2, "0")}:${String(minutes).padStart(2, "0")}:${String(secs).padStart(2, "0")}`;
-            }
 
-            function updateCountdownText() {
-                const node = document.getElementById("excel-countdown");
-                if (!node) {
-                    return;
-                }
+def cached_body(body, content_type):
+    body = body.encode("utf-8") if isinstance(body, str) else body
+    return {
+        "body": body,
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "etag": hashlib.sha256(body).hexdigest()[:20],
+        "content_type": content_type,
+    }
 
-                node.textContent = `До наступного завантаження Excel: ${formatCountdown(countdownSeconds)}`;
-            }
 
-            function applyVenueStatus(venueKey, venueStatus, override = null) {
-                const light = document.querySelector(`[data-light='${venueKey}']`);
-                const label = document.querySelector(`[data-label='${venueKey}']`);
-                const message = document.querySelector(`[data-message='${venueKey}']`);
-                if (!light || !label || !message) {
-                    return;
-                }
+def cached_response(entry, cache_control):
+    use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    etag = entry["etag"] + "-gz" if use_gzip else entry["etag"]
 
-                light.className = "status-light";
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif use_gzip:
+        response = Response(entry["gzip"], content_type=entry["content_type"])
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(entry["body"], content_type=entry["content_type"])
 
-                if (override === "downloading") {
-                    light.classList.add("status-busy");
-                    label.textContent = "Йде завантаження файлу";
-                    message.className = "pending-badge";
-                    message.textContent = "Завантаження PDF...";
-                    return;
-                }
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
 
-                if (venueStatus.error) {
-                    light.classList.add("status-error");
-                    label.textContent = "Помилка";
-                    message.className = "error-badge";
-                    message.textContent = venueStatus.error;
-                    return;
-                }
 
-                if (venueStatus.pdf_ready) {
-                    light.classList.add("status-ok");
-                    label.textContent = "Все добре";
-                    message.className = "ready-badge";
-                    message.textContent = "PDF готовий до завантаження";
-                    return;
-                }
+def load_static_assets():
+    # Assets are fingerprinted by content hash so browsers can cache them forever.
+    for filename, content_type in (
+        ("index.css", "text/css; charset=utf-8"),
+        ("index.js", "text/javascript; charset=utf-8"),
+    ):
+        with open(os.path.join(STATIC_DIR, filename), "rb") as f:
+            entry = cached_body(f.read(), content_type)
 
-                light.classList.add("status-busy");
-                label.textContent = "Оновлення";
-                message.className = "pending-badge";
-                message.textContent = "Меню оновлюється, спробуйте трохи пізніше";
-            }
+        stem, ext = os.path.splitext(filename)
+        entry["url"] = f"/assets/{stem}.{entry['etag'][:12]}{ext}"
+        STATIC_ASSETS[filename] = entry
 
-            async function refreshStatus() {
-                try {
-                    const response = await fetch("/status", { cache: "no-store" });
-                    if (!response.ok) return;
 
-                    const payload = await response.json();
-                    countdownSeconds = Number(payload.countdown_seconds || 0);
-                    updateCountdownText();
+def render_index():
+    # The landing page only depends on VENUES, so it is rendered once per
+    # registry version; reload_venues() swaps VENUES for a new dict.
+    venues = VENUES
+    cached = INDEX_CACHE.get("page")
+    if cached is not None and cached["venues"] is venues:
+        return cached
 
-                    Object.entries(payload.venues || {}).forEach(([venueKey, venueStatus]) => {
-                        applyVenueStatus(venueKey, venueStatus);
-                    });
-                } catch (e) {
-                    // ignore temporary network errors
-                }
-            }
+    venue_cards = [
+        {
+            "key": venue_key,
+            "name": venue["name"],
+            "variants": [
+                {"key": variant_name, "label": MENU_VARIANTS[variant_name]["label"]}
+                for variant_name in venue["variants"]
+                if variant_name != DEFAULT_VARIANT
+            ],
+        }
+        for venue_key, venue in venues.items()
+    ]
 
-            async function handleDownload(event) {
-                const button = event.currentTarget;
-                const venueKey = button.getAttribute("data-download");
-
-                button.disabled = true;
-                applyVenueStatus(venueKey, {}, "downloading");
-
-                try {
-                    const response = await fetch(`/download/${venueKey}`);
-                    if (!response.ok) {
-                        const errorText = await response.text();
-                        throw new Error(errorText || "download failed");
-                    }
-
-                    const blob = await response.blob();
-                    const url = URL.createObjectURL(blob);
-                    const anchor = document.createElement("a");
-                    anchor.href = url;
-                    anchor.download = `menu-${venueKey}.pdf`;
-                    document.body.appendChild(anchor);
-                    anchor.click();
-                    anchor.remove();
-                    URL.revokeObjectURL(url);
-                } catch (e) {
-                    applyVenueStatus(venueKey, { error: `Не вдалося завантажити PDF: ${e.message}` });
-                } finally {
-                    button.disabled = false;
-                    refreshStatus();
-                }
-            }
+    page = cached_body(
+        index_template.render(
+            venue_cards=venue_cards,
+            assets={filename: asset["url"] for filename, asset in STATIC_ASSETS.items()},
+        ),
+        "text/html; charset=utf-8",
+    )
+    page["venues"] = venues
+    INDEX_CACHE["page"] = page
+    return page
 
-            document.querySelectorAll("[data-download]").forEach((button) => {
-                button.addEventListener("click", handleDownload);
-            });
 
-            setInterval(() => {
-                if (countdownSeconds > 0) {
-                    countdownSeconds -= 1;
-                }
-                updateCountdownText();
-            }, 1000);
+@app.route("/")
+def index():
+    return cached_response(render_index(), "no-cache")
 
-            setInterval(refreshStatus, 10000);
-            refreshStatus();
-        </script>
-    </body>
-    </html>
-    """, venue_cards=venue_cards)
 
+@app.route("/assets/<asset_name>")
+def static_asset(asset_name):
+    stem, _, rest = asset_name.partition(".")
+    fingerprint, _, ext = rest.partition(".")
+    entry = STATIC_ASSETS.get(f"{stem}.{ext}")
+    if entry is None or entry["etag"][:12] != fingerprint:
+        return "Not found", 404
 
-@app.route("/download/<venue_key>")
-def download_pdf(venue_key):
-    refresh_pdf_ready_flags()
+    return cached_response(entry, f"public, max-age={STATIC_MAX_AGE}, immutable")
 
-    if venue_key not in VENUES:
+
+@app.route("/preview/<venue_key>/<version>/<int:page>.webp")
+def preview_image(venue_key, version, page):
+    # Versioned by PDF content (publish_previews), so cacheable forever.
+    if venue_key not in VENUES or not version.isalnum():
+        return "Not found", 404
+
+    path = os.path.join(venue_paths(venue_key)["previews"], version, preview_name(page))
+    if not os.path.isfile(path):
+        return "Not found", 404
+
+    response = send_file(path, mimetype="image/webp", max_age=STATIC_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@app.route("/download/<venue_key>")
+@app.route("/download/<venue_key>/<variant_name>")
+def download_pdf(venue_key, variant_name=DEFAULT_VARIANT):
+    venue = VENUES.get(venue_key)
+    venue_status = STATUS["venues"].get(venue_key)
+    if venue is None or venue_status is None:
         return "Unknown venue", 404
 
-    if not STATUS["venues"][venue_key]["pdf_ready"]:
+    if variant_name not in venue["variants"]:
+        return "Unknown menu variant", 404
+
+    pending = on_demand_update(venue_key, variant_name)
+    if pending is not None:
+        wait([pending], timeout=ON_DEMAND_TIMEOUT)
+        # The refresh published a new snapshot; ours predates it.
+        venue_status = STATUS["venues"].get(venue_key, venue_status)
+
+    if variant_name not in venue_status["variants_ready"]:
         return "PDF not ready yet", 503
 
-    paths = venue_paths(venue_key)
-    if not os.path.exists(paths["pdf"]):
-        STATUS["venues"][venue_key]["pdf_ready"] = False
+    download_name = f"menu-{venue_key}.pdf"
+    if variant_name != DEFAULT_VARIANT:
+        download_name = f"menu-{venue_key}-{variant_name}.pdf"
+
+    try:
+        return send_file(
+            variant_pdf_path(venue_key, variant_name),
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=download_name
+        )
+    except FileNotFoundError:
+        refresh_pdf_ready_flags([venue_key])
         return "PDF not ready yet", 503
 
-    return send_file(
-        paths["pdf"],
-        mimetype="application/pdf",
-        as_attachment=True,
-        download_name=f"menu-{venue_key}.pdf"
-    )
 
+@app.route("/download-all")
+def download_all():
+    include_xlsx = request.args.get("xlsx") in ("1", "true", "yes")
+    entries, version = bundle_entries(include_xlsx)
+    if not entries:
+        return "No menus ready yet", 503
+
+    download_name = "menus-with-xlsx.zip" if include_xlsx else "menus.zip"
+    bundle_path = os.path.abspath(os.path.join(BUNDLE_DIR, f"{version}.zip"))
+
+    if os.path.exists(bundle_path):
+        return send_file(
+            bundle_path,
+            mimetype="application/zip",
+            as_attachment=True,
+            download_name=download_name,
+            etag=version,
+        )
+
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    response = Response(stream_bundle(entries, bundle_path), mimetype="application/zip")
+    response.headers["Content-Disposition"] = f"attachment; filename={download_name}"
+    response.set_etag(version)
+    return response
+
+
+def trace_payloads():
+    payloads = []
+    for root in reversed(list(TRACES)):
+        payload = root.to_dict(root.started)
+        payload["started_at"] = datetime.fromtimestamp(root.started, KYIV_TIMEZONE).isoformat()
+        payloads.append(payload)
+    return payloads
+
+
+def waterfall_rows(node, total_ms, depth=0, critical=True, rows=None):
+    # The critical path follows whichever child finished last at each level.
+    rows = [] if rows is None else rows
+    end_ms = node["start_ms"] + node["duration_ms"]
+    rows.append({
+        **node,
+        "depth": depth,
+        "critical": critical,
+        "left": 100 * node["start_ms"] / total_ms if total_ms else 0,
+        "width": max(0.2, 100 * node["duration_ms"] / total_ms) if total_ms else 100,
+        "end_ms": end_ms,
+    })
 
-@app.route("/status")
-def status():
-    refresh_pdf_ready_flags()
+    last_child = max(node["children"], key=lambda child: child["start_ms"] + child["duration_ms"], default=None)
+    for child in node["children"]:
+        waterfall_rows(child, total_ms, depth + 1, critical and child is last_child, rows)
+    return rows
 
-    venues_payload = {}
-    for venue_key, venue_status in STATUS["venues"].items():
-        venues_payload[venue_key] = {
-            **venue_status,
-            "last_success": venue_status["last_success"].isoformat() if venue_status["last_success"] else None,
-            "last_attempt": venue_status["last_attempt"].isoformat() if venue_status["last_attempt"] else None,
-        }
 
-    return jsonify({
-        "timezone": "Europe/Kyiv",
-        "last_update": STATUS["last_update"].isoformat() if STATUS["last_update"] else None,
-        "next_update": STATUS["next_update"].isoformat() if STATUS["next_update"] else None,
-        "countdown_seconds": STATUS["countdown"],
-        "venues": venues_payload,
-    })
+@app.route("/debug/cycles")
+def debug_cycles():
+    return jsonify({"history": TRACE_HISTORY, "cycles": trace_payloads()})
+
+
+@app.route("/debug/cycles/waterfall")
+def debug_cycles_waterfall():
+    cycles = [
+        {"trace": trace, "rows": waterfall_rows(trace, trace["duration_ms"])}
+        for trace in trace_payloads()
+    ]
+    return render_template("cycles.html", cycles=cycles)
+
+
+def webhook_authorized():
+    # Either "Authorization: Bearer <secret>" or an HMAC-SHA256 of the raw
+    # body as "X-Webhook-Signature: sha256=<hex>".
+    # compare_digest() only takes ASCII str, so both sides are compared as
+    # bytes; WSGI hands headers over latin-1 decoded, which restores the raw ones.
+    secret = WEBHOOK_SECRET.encode("utf-8")
+    signature = request.headers.get("X-Webhook-Signature", "")
+    if signature:
+        expected = hmac.new(secret, request.get_data(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(signature.encode("latin-1"), f"sha256={expected}".encode("ascii"))
+
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    return bool(token) and hmac.compare_digest(token.encode("latin-1"), secret)
+
+
+@app.route("/webhook/<venue_key>", methods=["POST"])
+def menu_changed_webhook(venue_key):
+    if not WEBHOOK_SECRET:
+        return "Not found", 404
+    if not webhook_authorized():
+        return "Unauthorized", 401
+    if venue_key not in VENUES:
+        return "Unknown venue", 404
+
+    try:
+        due_at = queue_venue_refresh(venue_key)
+    except (sqlite3.Error, OSError):
+        logging.exception(f"[{venue_key}] Failed to queue webhook refresh")
+        return "Refresh queue unavailable", 503
+
+    logging.info(f"[{venue_key}] Menu change signalled, refresh in {due_at - time.time():.0f}s")
+    return jsonify({"venue": venue_key, "refresh_in_seconds": round(due_at - time.time())}), 202
+
+
+@app.route("/status")
+def status():
+    # Serialized by publish_status(); no per-request encoding or file checks.
+    return Response(STATUS_BODY, mimetype="application/json")
 
 
 # ======================
@@ -1056,22 +2101,207 @@ def status():
 # ======================
 
 def background_worker():
-    refresh_pdf_ready_flags()
     update_menu()  # first run immediately
 
+    # Follows STATUS["next_update"], so a cycle started elsewhere (lease
+    # takeover) also moves the schedule.
+    ticks = 0
     while True:
-        for i in range(UPDATE_INTERVAL, 0, -1):
-            STATUS["countdown"] = i
-            time.sleep(1)
+        next_update = STATUS["next_update"]
+        remaining = int((next_update - now_kyiv()).total_seconds()) if next_update else 0
+        update_status(countdown=max(remaining, 0))
+        if remaining <= 0 and not update_lock.locked():
+            update_menu()
+
+        ticks += 1
+        if ticks % VENUES_RELOAD_INTERVAL == 0:
+            reload_venues()
+        time.sleep(1)
+
+
+# ======================
+# BATCH RENDER (CLI)
+# ======================
+
+def collect_excel_files(inputs):
+    # Returns (path, output stem) pairs; files found under a directory keep
+    # their relative path so same-named exports don't collide.
+    files = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for root, _, names in os.walk(input_path):
+                for name in sorted(names):
+                    if name.lower().endswith(".xlsx") and not name.startswith("~$"):
+                        path = os.path.join(root, name)
+                        files.append((path, os.path.splitext(os.path.relpath(path, input_path))[0]))
+        elif os.path.isfile(input_path):
+            files.append((input_path, os.path.splitext(os.path.basename(input_path))[0]))
+        else:
+            raise Exception(f"No such file or directory: {input_path}")
+    return sorted(files)
+
+
+def default_cover_name(excel_path):
+    # ChoiceQR exports are all called menu.xlsx (SAVE_PATH/<venue>/menu.xlsx),
+    # so their directory names the venue; other files are named by their stem.
+    stem = os.path.splitext(os.path.basename(excel_path))[0]
+    if stem.lower() == "menu":
+        return os.path.basename(os.path.dirname(os.path.abspath(excel_path))) or stem
+    return stem
+
+
+def render_excel_file(excel_path, out_stem, venue):
+    # Runs in a worker process, which is the isolation boundary here, so
+    # WeasyPrint renders in-process instead of in a sandbox child.
+    started = time.monotonic()
+    menu = parse_menu_excel(excel_path)
+    venue = {**venue, "name": venue["name"] or default_cover_name(excel_path)}
+
+    outputs = []
+    for variant_name in venue["variants"]:
+        pdf_path = f"{out_stem}.pdf" if variant_name == DEFAULT_VARIANT else f"{out_stem}-{variant_name}.pdf"
+        os.makedirs(os.path.dirname(pdf_path) or ".", exist_ok=True)
+        stats = render_pdf(build_html(menu, venue, variant_name), pdf_path, venue, sandbox=False)
+        outputs.append((pdf_path, stats["bytes"]))
+
+    return {
+        "dishes": menu.dish_count,
+        "outputs": outputs,
+        "seconds": time.monotonic() - started,
+    }
+
+
+def batch_render(inputs, out_dir, venue, jobs):
+    files = collect_excel_files(inputs)
+    if not files:
+        print("No .xlsx files found")
+        return False
+
+    print(f"Rendering {len(files)} files with {jobs} workers -> {out_dir}")
+    started = time.monotonic()
+    results = {}
+    failures = {}
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(render_excel_file, excel_path, os.path.join(out_dir, out_stem), venue): excel_path
+            for excel_path, out_stem in files
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            excel_path = futures[future]
+            try:
+                result = results[excel_path] = future.result()
+                total_kb = sum(size for _, size in result["outputs"]) / 1024
+                print(
+                    f"[{done}/{len(files)}] ok   {excel_path}: {result['dishes']} dishes,"
+                    f" {len(result['outputs'])} PDFs, {total_kb:.0f} KB in {result['seconds']:.2f}s"
+                )
+            except Exception as e:
+                failures[excel_path] = str(e)
+                print(f"[{done}/{len(files)}] FAIL {excel_path}: {e}")
+
+    elapsed = time.monotonic() - started
+    render_seconds = sum(result["seconds"] for result in results.values())
+    print(
+        f"\nRendered {len(results)}/{len(files)} files in {elapsed:.2f}s"
+        f" ({render_seconds:.2f}s of render time, {render_seconds / elapsed if elapsed else 0:.1f}x parallel)"
+    )
+
+    slowest = sorted(results.items(), key=lambda item: item[1]["seconds"], reverse=True)[:5]
+    if slowest:
+        print("Slowest:")
+        for excel_path, result in slowest:
+            print(f"  {result['seconds']:7.2f}s  {excel_path}")
+    if failures:
+        print("Failed:")
+        for excel_path, error in failures.items():
+            print(f"  {excel_path}: {error}")
 
-        update_menu()
+    return not failures
+
+
+def cli_venue(args):
+    venue = dict(VENUES[args.venue]) if args.venue else {
+        "name": "",
+        "subbrand": "",
+        "section_order": [],
+        "excluded_sections": [],
+        "variants": [DEFAULT_VARIANT],
+        "render_memory_limit_mb": RENDER_MEMORY_LIMIT_MB,
+        "render_timeout": RENDER_TIMEOUT,
+        "pdf_optimize": PDF_OPTIMIZE,
+    }
+
+    if args.name:
+        venue["name"] = args.name
+    if args.subbrand is not None:
+        venue["subbrand"] = args.subbrand
+    if args.section_order:
+        venue["section_order"] = args.section_order
+    if args.exclude:
+        venue["excluded_sections"] = args.exclude
+    if args.variants:
+        variants = [variant_name.strip() for variant_name in args.variants.split(",") if variant_name.strip()]
+        unknown = [variant_name for variant_name in variants if variant_name not in MENU_VARIANTS]
+        if unknown:
+            raise Exception(f"Unknown variants: {', '.join(unknown)}")
+        venue["variants"] = variants
+    if args.no_optimize:
+        venue["pdf_optimize"] = False
+    return venue
 
 
 # ======================
 # START
 # ======================
 
+reload_venues(force=True)
+load_static_assets()
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ChoiceQR menu PDF server.")
+    parser.add_argument(
+        "--rebuild", nargs="*", metavar="VENUE",
+        help="re-render PDFs of all (or the given) venues from cached menus and exit",
+    )
+    render_group = parser.add_argument_group("batch render", "render ChoiceQR exports to PDFs offline and exit")
+    render_group.add_argument("--render", nargs="+", metavar="PATH", help="XLSX files or directories to render")
+    render_group.add_argument("--out", default="./rendered", help="output directory (default ./rendered)")
+    render_group.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="worker processes")
+    render_group.add_argument("--venue", help="take layout settings from this venues.json entry")
+    render_group.add_argument(
+        "--name", help="brand shown on the cover (default: venue name, else file name; directory name for menu.xlsx)",
+    )
+    render_group.add_argument("--subbrand", help="subtitle shown on the cover")
+    render_group.add_argument("--section-order", action="append", metavar="SECTION", help="repeat to order sections")
+    render_group.add_argument("--exclude", action="append", metavar="SECTION", help="repeat to skip sections")
+    render_group.add_argument("--variants", help=f"comma-separated layout variants ({', '.join(MENU_VARIANTS)})")
+    render_group.add_argument("--no-optimize", action="store_true", help="skip the PDF optimization pass")
+    args = parser.parse_args()
+
+    if args.render:
+        if args.venue and args.venue not in VENUES:
+            parser.error(f"unknown venue: {args.venue}")
+        try:
+            venue = cli_venue(args)
+        except Exception as e:
+            parser.error(str(e))
+        sys.exit(0 if batch_render(args.render, args.out, venue, max(1, args.jobs)) else 1)
+
+    if args.rebuild is not None:
+        unknown = [venue_key for venue_key in args.rebuild if venue_key not in VENUES]
+        if unknown:
+            parser.error(f"unknown venues: {', '.join(unknown)}")
+        sys.exit(0 if rebuild_menus(args.rebuild or None) else 1)
+
+    # As PID 1 in a container there is no default SIGTERM handling; exit
+    # cleanly so the lease is released and a standby takes over at once.
+    atexit.register(release_update_lease)
+    signal.signal(signal.SIGTERM, release_lease_and_exit)
+    threading.Thread(target=lease_worker, daemon=True).start()
+    if WEBHOOK_SECRET:
+        threading.Thread(target=refresh_worker, daemon=True).start()
+
     t = threading.Thread(target=background_worker, daemon=True)
     t.start()
 
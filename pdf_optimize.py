@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+
+# Post-processing for PDFs written by WeasyPrint. WeasyPrint already embeds
+# only the used glyphs of each font (full_fonts=False), so this pass rewrites
+# the file with identical objects merged, all streams flate-compressed at
+# level 9 and objects packed into object streams. The result is only kept if
+# every page still draws the same content from the same resources.
+
+try:
+    import pikepdf
+except ImportError:  # optional: without pikepdf PDFs are published as written
+    pikepdf = None
+
+# Keys that only describe how a stream is encoded, not what it contains.
+ENCODING_KEYS = {"/Length", "/Filter", "/DecodeParms", "/DL"}
+
+
+def unparse(value):
+    # pikepdf hands numbers and booleans back as plain Python values.
+    if isinstance(value, pikepdf.Object):
+        return value.unparse()
+    return repr(value).encode()
+
+
+def object_key(obj):
+    # Identity of an indirect object by content; references inside it are
+    # compared by object number, so run dedupe_objects() until it settles.
+    if isinstance(obj, pikepdf.Stream):
+        items = sorted((str(key), unparse(value)) for key, value in obj.stream_dict.items() if key != "/Length")
+        return ("stream", tuple(items), hashlib.sha256(obj.read_raw_bytes()).digest())
+    if isinstance(obj, pikepdf.Dictionary) and obj.get("/Type") in ("/Page", "/Pages", "/Catalog"):
+        return None  # the page tree must keep one node per page
+    if isinstance(obj, (pikepdf.Dictionary, pikepdf.Array)):
+        return ("object", obj.unparse())
+    return None
+
+
+def repoint(container, replacements):
+    if isinstance(container, pikepdf.Array):
+        slots = range(len(container))
+    elif isinstance(container, (pikepdf.Dictionary, pikepdf.Stream)):
+        slots = list(container.keys())
+    else:
+        return
+
+    for slot in slots:
+        value = container[slot]
+        if not isinstance(value, pikepdf.Object):
+            continue
+        if value.is_indirect:
+            replacement = replacements.get(value.objgen)
+            if replacement is not None:
+                container[slot] = replacement
+        else:
+            repoint(value, replacements)
+
+
+def dedupe_objects(pdf):
+    # Merged duplicates stay in pdf.objects until save drops them as
+    # unreferenced, so they are tracked in replacements and skipped.
+    replacements = {}
+    while True:
+        canonical = {}
+        merged = {}
+        for obj in pdf.objects:
+            if not obj.is_indirect or obj.objgen == (0, 0) or obj.objgen in replacements:
+                continue
+            key = object_key(obj)
+            if key is None:
+                continue
+            if key in canonical:
+                merged[obj.objgen] = canonical[key]
+            else:
+                canonical[key] = obj
+
+        if not merged:
+            return len(replacements)
+
+        replacements.update(merged)
+        for obj in pdf.objects:
+            if obj.is_indirect and obj.objgen not in replacements:
+                repoint(obj, replacements)
+        repoint(pdf.trailer, replacements)
+
+
+def render_fingerprint(pdf):
+    # Hash of everything that affects drawing: page geometry, decoded content
+    # streams and the decoded resources they use, independent of object
+    # numbering, stream filters and object streams.
+    seen = {}
+
+    def fingerprint(obj):
+        if not isinstance(obj, pikepdf.Object):
+            return unparse(obj)
+
+        if obj.is_indirect:
+            if obj.objgen in seen:
+                return seen[obj.objgen]
+            seen[obj.objgen] = b"cycle"
+
+        digest = hashlib.sha256()
+        if isinstance(obj, pikepdf.Stream):
+            digest.update(b"stream")
+            digest.update(obj.read_bytes())
+            for key in sorted(obj.stream_dict.keys()):
+                if key not in ENCODING_KEYS:
+                    digest.update(key.encode() + fingerprint(obj.stream_dict[key]))
+        elif isinstance(obj, pikepdf.Dictionary):
+            digest.update(b"dict")
+            for key in sorted(obj.keys()):
+                if key != "/Parent":
+                    digest.update(key.encode() + fingerprint(obj[key]))
+        elif isinstance(obj, pikepdf.Array):
+            digest.update(b"array")
+            for item in obj:
+                digest.update(fingerprint(item))
+        else:
+            digest.update(obj.unparse())
+
+        result = digest.digest()
+        if obj.is_indirect:
+            seen[obj.objgen] = result
+        return result
+
+    pages = hashlib.sha256()
+    for page in pdf.pages:
+        pages.update(fingerprint(page.obj))
+    return pages.hexdigest()
+
+
+def optimize_pdf(pdf_path, dedupe=True):
+    # Rewrites pdf_path in place when that makes it smaller and renders the
+    # same. Never raises: a failed pass leaves the file untouched and is
+    # reported under "error".
+    bytes_before = os.path.getsize(pdf_path)
+    result = {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_before,
+        "optimized": False,
+        "objects_merged": 0,
+        "error": None,
+    }
+
+    if pikepdf is None:
+        result["error"] = "pikepdf is not installed"
+        return result
+
+    optimized_path = pdf_path + ".opt"
+    try:
+        with pikepdf.open(pdf_path) as pdf:
+            expected = render_fingerprint(pdf)
+            if dedupe:
+                result["objects_merged"] = dedupe_objects(pdf)
+            pdf.save(
+                optimized_path,
+                compress_streams=True,
+                recompress_flate=True,
+                stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
+                object_stream_mode=pikepdf.ObjectStreamMode.generate,
+            )
+
+        with pikepdf.open(optimized_path) as optimized:
+            identical = render_fingerprint(optimized) == expected
+
+        bytes_after = os.path.getsize(optimized_path)
+        if not identical:
+            result["error"] = "optimized PDF does not render identically"
+        elif bytes_after < bytes_before:
+            os.replace(optimized_path, pdf_path)
+            result.update({"bytes_after": bytes_after, "optimized": True})
+    except Exception as e:
+        result["error"] = f"PDF optimization failed: {e}"
+    finally:
+        if os.path.exists(optimized_path):
+            os.remove(optimized_path)
+
+    if result["error"]:
+        logging.warning(f"{pdf_path}: {result['error']}, keeping the original PDF")
+    return result
+
+
+if pikepdf is not None:
+    pikepdf.settings.set_flate_compression_level(9)
@@ -0,0 +1,52 @@
+import logging
+import os
+
+# Small WebP previews of the first pages of a rendered menu PDF, so the index
+# page can show what a menu looks like without downloading the whole file.
+# Rasterized with pdfium and encoded with Pillow; at 360px wide a text page
+# is a few KB.
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # optional: without pypdfium2 venues simply have no previews
+    pdfium = None
+
+PREVIEW_WIDTH = 360
+PREVIEW_QUALITY = 60
+
+
+def preview_name(page_number):
+    return f"page-{page_number}.webp"
+
+
+def render_previews(pdf_path, out_dir, max_pages, width=PREVIEW_WIDTH):
+    # Writes preview_name(1..n) into out_dir. Never raises: a failed pass
+    # leaves out_dir partially filled and is reported under "error".
+    result = {"pages": 0, "bytes": 0, "error": None}
+
+    if pdfium is None:
+        result["error"] = "pypdfium2 is not installed"
+        return result
+
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            for index in range(min(len(pdf), max_pages)):
+                page = pdf[index]
+                try:
+                    bitmap = page.render(scale=width / page.get_width())
+                    path = os.path.join(out_dir, preview_name(index + 1))
+                    bitmap.to_pil().convert("RGB").save(path, "WEBP", quality=PREVIEW_QUALITY, method=6)
+                finally:
+                    page.close()
+                result["pages"] += 1
+                result["bytes"] += os.path.getsize(path)
+        finally:
+            pdf.close()
+    except Exception as e:
+        result["error"] = f"Preview rendering failed: {e}"
+
+    if result["error"]:
+        logging.warning(f"{pdf_path}: {result['error']}")
+    return result
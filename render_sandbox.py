@@ -0,0 +1,64 @@
+import json
+import resource
+import sys
+import time
+
+# Child process entry point for generate_menu_pdf(): reads menu HTML from
+# stdin, writes the PDF to argv[1] under an address-space limit of argv[2] MB,
+# optionally runs the pdf_optimize pass (argv[3] == "1"), writes up to argv[5]
+# page previews into argv[4] when given, and prints a JSON report (peak RSS,
+# duration, sizes, error) on stdout.
+
+
+def report(payload, exit_code):
+    payload["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    sys.stdout.write(json.dumps(payload))
+    sys.stdout.flush()
+    sys.exit(exit_code)
+
+
+def main():
+    pdf_path = sys.argv[1]
+    memory_limit_mb = int(sys.argv[2])
+    optimize = len(sys.argv) > 3 and sys.argv[3] == "1"
+    preview_dir = sys.argv[4] if len(sys.argv) > 5 else ""
+
+    if memory_limit_mb > 0:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    started = time.monotonic()
+
+    try:
+        from weasyprint import HTML
+
+        html_content = sys.stdin.buffer.read().decode("utf-8")
+        HTML(string=html_content).write_pdf(pdf_path)
+    except MemoryError:
+        report({"error": "memory", "seconds": time.monotonic() - started}, 3)
+    except Exception as e:
+        report({"error": str(e), "seconds": time.monotonic() - started}, 1)
+
+    payload = {"error": None, "seconds": time.monotonic() - started}
+
+    if optimize:
+        try:
+            from pdf_optimize import optimize_pdf
+
+            payload["optimize"] = optimize_pdf(pdf_path)
+        except MemoryError:
+            payload["optimize"] = {"error": "PDF optimization ran out of memory"}
+
+    if preview_dir:
+        try:
+            from pdf_preview import render_previews
+
+            payload["previews"] = render_previews(pdf_path, preview_dir, int(sys.argv[5]))
+        except MemoryError:
+            payload["previews"] = {"pages": 0, "bytes": 0, "error": "Preview rendering ran out of memory"}
+
+    report(payload, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+let countdownSeconds = 0;
+
+function formatCountdown(seconds) {
+    if (!seconds || seconds <= 0) {
+        return "оновлення виконується";
+    }
+
+    const hours = Math.floor(seconds / 3600);
+    const minutes = Math.floor((seconds % 3600) / 60);
+    const secs = seconds % 60;
+    return `${String(hours).padStart(2, "0")}:${String(minutes).padStart(2, "0")}:${String(secs).padStart(2, "0")}`;
+}
+
+function updateCountdownText() {
+    const node = document.getElementById("excel-countdown");
+    if (!node) {
+        return;
+    }
+
+    node.textContent = `До наступного завантаження Excel: ${formatCountdown(countdownSeconds)}`;
+}
+
+function applyVenueStatus(venueKey, venueStatus, override = null) {
+    const light = document.querySelector(`[data-light='${venueKey}']`);
+    const label = document.querySelector(`[data-label='${venueKey}']`);
+    const message = document.querySelector(`[data-message='${venueKey}']`);
+    if (!light || !label || !message) {
+        return;
+    }
+
+    light.className = "status-light";
+
+    if (override === "downloading") {
+        light.classList.add("status-busy");
+        label.textContent = "Йде завантаження файлу";
+        message.className = "pending-badge";
+        message.textContent = "Завантаження PDF...";
+        return;
+    }
+
+    if (venueStatus.error) {
+        light.classList.add("status-error");
+        label.textContent = "Помилка";
+        message.className = "error-badge";
+        message.textContent = venueStatus.error;
+        return;
+    }
+
+    if (venueStatus.pdf_ready) {
+        light.classList.add("status-ok");
+        label.textContent = "Все добре";
+        message.className = "ready-badge";
+        message.textContent = "PDF готовий до завантаження";
+        return;
+    }
+
+    light.classList.add("status-busy");
+    label.textContent = "Оновлення";
+    message.className = "pending-badge";
+    message.textContent = "Меню оновлюється, спробуйте трохи пізніше";
+}
+
+function applyVenuePreviews(venueKey, previews) {
+    const strip = document.querySelector(`[data-previews='${venueKey}']`);
+    if (!strip || !previews || !previews.pages || strip.dataset.version === previews.version) {
+        return;
+    }
+
+    strip.dataset.version = previews.version;
+    strip.replaceChildren();
+    for (let page = 1; page <= previews.pages; page += 1) {
+        const src = `/preview/${venueKey}/${previews.version}/${page}.webp`;
+        const link = document.createElement("a");
+        link.href = src;
+        link.target = "_blank";
+        const image = document.createElement("img");
+        image.src = src;
+        image.loading = "lazy";
+        image.alt = `Сторінка ${page}`;
+        link.appendChild(image);
+        strip.appendChild(link);
+    }
+    strip.hidden = false;
+}
+
+async function refreshStatus() {
+    try {
+        const response = await fetch("/status", { cache: "no-store" });
+        if (!response.ok) return;
+
+        const payload = await response.json();
+        countdownSeconds = Number(payload.countdown_seconds || 0);
+        updateCountdownText();
+
+        Object.entries(payload.venues || {}).forEach(([venueKey, venueStatus]) => {
+            applyVenueStatus(venueKey, venueStatus);
+            applyVenuePreviews(venueKey, venueStatus.previews);
+        });
+    } catch (e) {
+        // ignore temporary network errors
+    }
+}
+
+async function handleDownload(event) {
+    const button = event.currentTarget;
+    const venueKey = button.getAttribute("data-download");
+
+    button.disabled = true;
+    applyVenueStatus(venueKey, {}, "downloading");
+
+    try {
+        const response = await fetch(`/download/${venueKey}`);
+        if (!response.ok) {
+            const errorText = await response.text();
+            throw new Error(errorText || "download failed");
+        }
+
+        const blob = await response.blob();
+        const url = URL.createObjectURL(blob);
+        const anchor = document.createElement("a");
+        anchor.href = url;
+        anchor.download = `menu-${venueKey}.pdf`;
+        document.body.appendChild(anchor);
+        anchor.click();
+        anchor.remove();
+        URL.revokeObjectURL(url);
+    } catch (e) {
+        applyVenueStatus(venueKey, { error: `Не вдалося завантажити PDF: ${e.message}` });
+    } finally {
+        button.disabled = false;
+        refreshStatus();
+    }
+}
+
+document.querySelectorAll("[data-download]").forEach((button) => {
+    button.addEventListener("click", handleDownload);
+});
+
+setInterval(() => {
+    if (countdownSeconds > 0) {
+        countdownSeconds -= 1;
+    }
+    updateCountdownText();
+}, 1000);
+
+setInterval(refreshStatus, 10000);
+refreshStatus();